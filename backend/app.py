@@ -1,9 +1,22 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g
 from flask_cors import CORS
 from services.chatbot import ChatService
+from services.chat_cache import chat_cache
 from services.sustainability import sustainability_service
 from services.seller_sustainability import seller_sustainability_service
+from services.cache import metrics_cache
+from services.notifications import notification_service
+from services.verification import verification_service
+from services.leaderboard import leaderboard, METRICS, WINDOWS
+from services.event_store import EVENT_NAMES, normalize_address
+from services.instrumentation import registry, SamplingProfiler
+from config import Config
+from datetime import datetime
+from urllib.parse import urlencode
+import json
 import logging
+import time
+import zlib
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -12,6 +25,39 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend access
 
+request_seconds = registry.histogram(
+    "warranchain_http_request_seconds", "Latency of HTTP requests", ["method", "endpoint", "status"]
+)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    # Opt-in sampling profile of this request: ?profile=1 with PROFILING_ENABLED
+    if Config.PROFILING_ENABLED and request.args.get('profile') == '1':
+        g.profiler = SamplingProfiler(interval=Config.PROFILE_SAMPLE_INTERVAL).start()
+
+@app.after_request
+def record_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        request_seconds.observe(time.perf_counter() - started, method=request.method,
+                                endpoint=endpoint, status=response.status_code)
+    profiler = g.pop('profiler', None)
+    if profiler is not None and not response.is_streamed:
+        # Collapsed stacks, readable by flamegraph.pl and speedscope
+        stacks = profiler.stop()
+        response = Response(stacks, mimetype='text/plain')
+        response.headers['X-Profile-Samples'] = str(sum(profiler.samples.values()))
+    elif profiler is not None:
+        profiler.stop()
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of the backend's counters and histograms"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/chat', methods=['POST'])
 def chat_handler():
     try:
@@ -41,6 +87,34 @@ def chat_handler():
         logger.error(f"Error in chat_handler: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream_handler():
+    """Stream the chatbot reply as server-sent events, one token per event"""
+    data = request.json
+    if not data:
+        return jsonify({"error": "No JSON data provided"}), 400
+
+    messages = data.get('messages', [])
+    if not messages:
+        return jsonify({"error": "No messages provided"}), 400
+
+    logger.info(f"Received streaming chat request with {len(messages)} messages")
+
+    def generate():
+        try:
+            for token in ChatService.stream_chat_response(messages):
+                yield f"data: {json.dumps({'token': token})}\n\n"
+        except Exception as e:
+            logger.error(f"Error in chat_stream_handler: {str(e)}")
+            yield f"data: {json.dumps({'error': ChatService.FALLBACK_RESPONSE})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
@@ -61,6 +135,9 @@ def get_sustainability_metrics():
 @app.route('/api/sustainability/user/<user_address>', methods=['GET'])
 def get_user_sustainability_metrics(user_address):
     """Get sustainability metrics for a specific user"""
+    user_address = normalize_address(user_address)
+    if user_address is None:
+        return jsonify({"error": "Invalid user address"}), 400
     try:
         metrics = sustainability_service.get_user_sustainability_metrics(user_address)
         return jsonify(metrics)
@@ -68,31 +145,160 @@ def get_user_sustainability_metrics(user_address):
         logger.error(f"Error getting user sustainability metrics: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+def _trend_days():
+    """Validated ?days= parameter, or None if it is not an integer in range"""
+    try:
+        days = int(request.args.get('days', 30))
+    except ValueError:
+        return None
+    return days if 1 <= days <= Config.TRENDS_MAX_DAYS else None
+
 @app.route('/api/sustainability/trends', methods=['GET'])
 def get_sustainability_trends():
     """Get sustainability trends over time"""
+    days = _trend_days()
+    if days is None:
+        return jsonify({"error": f"days must be an integer between 1 and {Config.TRENDS_MAX_DAYS}"}), 400
     try:
-        days = int(request.args.get('days', 30))
         trends = sustainability_service.get_sustainability_trends(days)
         return jsonify(trends)
     except Exception as e:
         logger.error(f"Error getting sustainability trends: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+def _parse_time_ms(value):
+    """Epoch milliseconds from an integer or ISO-8601 query parameter"""
+    if value is None or value == '':
+        return None
+    if value.lstrip('-').isdigit():
+        return int(value)
+    return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() * 1000)
+
+def _ndjson(events, compress):
+    """Encode events as NDJSON in batches, gzip-compressing incrementally if asked"""
+    gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    lines = []
+    for event in events:
+        lines.append(json.dumps(event, separators=(',', ':')))
+        if len(lines) >= Config.EVENTS_STREAM_CHUNK:
+            chunk = ("\n".join(lines) + "\n").encode()
+            lines = []
+            yield gzip.compress(chunk) + gzip.flush(zlib.Z_SYNC_FLUSH) if gzip else chunk
+    chunk = ("\n".join(lines) + "\n").encode() if lines else b""
+    if gzip:
+        yield gzip.compress(chunk) + gzip.flush()
+    elif chunk:
+        yield chunk
+
 @app.route('/api/sustainability/events', methods=['GET'])
 def get_sustainability_events():
-    """Get raw sustainability events from blockchain"""
+    """Stream one page of raw warranty events as NDJSON, oldest first"""
+    try:
+        cursor = int(request.args.get('cursor') or 0)
+        limit = int(request.args.get('limit') or Config.EVENTS_PAGE_LIMIT)
+        since_ms = _parse_time_ms(request.args.get('since'))
+        until_ms = _parse_time_ms(request.args.get('until'))
+    except ValueError:
+        return jsonify({"error": "cursor and limit must be integers, since/until epoch ms or ISO dates"}), 400
+    if cursor < 0 or not 0 < limit <= Config.EVENTS_PAGE_MAX:
+        return jsonify({"error": f"limit must be between 1 and {Config.EVENTS_PAGE_MAX}"}), 400
+
+    kinds = None
+    if request.args.get('type'):
+        names = {name.lower(): kind for kind, name in EVENT_NAMES.items()}
+        requested = [t.strip().lower() for t in request.args['type'].split(',') if t.strip()]
+        kinds = [t if t in EVENT_NAMES else names.get(t) for t in requested]
+        if None in kinds:
+            return jsonify({"error": f"type must be one of {', '.join(EVENT_NAMES)}"}), 400
+
     try:
-        events = sustainability_service._get_warranty_events()
-        return jsonify(events)
+        next_cursor, has_more, events = sustainability_service.export_events(cursor, limit, kinds, since_ms, until_ms)
     except Exception as e:
         logger.error(f"Error getting sustainability events: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+    compress = 'gzip' in request.headers.get('Accept-Encoding', '')
+    response = Response(stream_with_context(_ndjson(events, compress)), mimetype='application/x-ndjson')
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers['Vary'] = 'Accept-Encoding'
+    # Exporters resume from X-Next-Cursor even after the last page
+    response.headers['X-Next-Cursor'] = str(next_cursor)
+    if has_more:
+        args = request.args.to_dict()
+        args['cursor'] = str(next_cursor)
+        response.headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    return response
+
+@app.route('/chat/cache-stats', methods=['GET'])
+def get_chat_cache_stats():
+    """Get hit/miss counters for the chatbot response cache"""
+    return jsonify(chat_cache.stats())
+
+@app.route('/api/sustainability/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Get hit/miss/refresh counters for the metrics caches"""
+    return jsonify(metrics_cache.stats())
+
+@app.route('/api/notifications/stats', methods=['GET'])
+def get_notification_stats():
+    """Get expiry notification scheduler counters"""
+    return jsonify(notification_service.get_stats())
+
+# Warranty Verification Endpoints
+@app.route('/api/verify/stats', methods=['GET'])
+def get_verification_stats():
+    """Get hit/miss counters for the verification cache"""
+    return jsonify(verification_service.get_stats())
+
+@app.route('/api/verify/<nft_id>', methods=['GET'])
+def verify_warranty(nft_id):
+    """Verify one warranty by NFT id"""
+    try:
+        return jsonify(verification_service.verify(nft_id))
+    except Exception as e:
+        logger.error(f"Error verifying warranty: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/verify/serial/<serial_number>', methods=['GET'])
+def verify_warranty_by_serial(serial_number):
+    """Verify one warranty by product serial number"""
+    try:
+        return jsonify(verification_service.verify_serials([serial_number])[0])
+    except Exception as e:
+        logger.error(f"Error verifying warranty by serial: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/verify/batch', methods=['POST'])
+def verify_warranties_batch():
+    """Verify many warranties by NFT id and/or serial number"""
+    data = request.json or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    nft_ids = data.get('nft_ids', [])
+    serials = data.get('serials', [])
+    if not isinstance(nft_ids, list) or not isinstance(serials, list):
+        return jsonify({"error": "nft_ids and serials must be lists"}), 400
+    if not nft_ids and not serials:
+        return jsonify({"error": "No nft_ids or serials provided"}), 400
+    if len(nft_ids) + len(serials) > Config.VERIFY_BATCH_MAX:
+        return jsonify({"error": f"At most {Config.VERIFY_BATCH_MAX} ids per request"}), 400
+    try:
+        results = verification_service.verify_many([str(i) for i in nft_ids]) if nft_ids else []
+        if serials:
+            results += verification_service.verify_serials([str(s) for s in serials])
+        return jsonify({"results": results, "count": len(results)})
+    except Exception as e:
+        logger.error(f"Error verifying warranty batch: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 # Seller Sustainability Dashboard Endpoints
 @app.route('/api/seller/sustainability/<seller_address>', methods=['GET'])
 def get_seller_sustainability_metrics(seller_address):
     """Get sustainability metrics for a specific seller"""
+    seller_address = normalize_address(seller_address)
+    if seller_address is None:
+        return jsonify({"error": "Invalid seller address"}), 400
     try:
         force_refresh = request.args.get('refresh', 'false').lower() == 'true'
         metrics = seller_sustainability_service.get_seller_sustainability_metrics(
@@ -106,6 +312,9 @@ def get_seller_sustainability_metrics(seller_address):
 @app.route('/api/seller/achievements/<seller_address>', methods=['GET'])
 def get_seller_achievements(seller_address):
     """Get achievements for a specific seller"""
+    seller_address = normalize_address(seller_address)
+    if seller_address is None:
+        return jsonify({"error": "Invalid seller address"}), 400
     try:
         achievements = seller_sustainability_service.get_seller_achievements(seller_address)
         return jsonify(achievements)
@@ -113,11 +322,79 @@ def get_seller_achievements(seller_address):
         logger.error(f"Error getting seller achievements: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/seller/sustainability/batch', methods=['POST'])
+def get_seller_sustainability_batch():
+    """Get sustainability metrics for many sellers in one request"""
+    data = request.json or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    addresses = data.get('addresses', [])
+    if not isinstance(addresses, list) or not addresses:
+        return jsonify({"error": "addresses must be a non-empty list"}), 400
+    if len(addresses) > Config.SELLER_BATCH_MAX:
+        return jsonify({"error": f"At most {Config.SELLER_BATCH_MAX} addresses per request"}), 400
+    normalized = [normalize_address(str(a)) for a in addresses]
+    invalid = [a for a, n in zip(addresses, normalized) if n is None]
+    try:
+        results = seller_sustainability_service.get_many_seller_metrics([n for n in normalized if n])
+        return jsonify({"results": results, "count": len(results), "invalid": invalid})
+    except Exception as e:
+        logger.error(f"Error getting seller sustainability batch: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+def _leaderboard_args():
+    """Validated (metric, window) query parameters, or an error message"""
+    metric = request.args.get('metric', 'ewaste')
+    window = request.args.get('window', 'all')
+    if metric not in METRICS:
+        return None, None, f"metric must be one of {', '.join(METRICS)}"
+    if window not in WINDOWS:
+        return None, None, f"window must be one of {', '.join(WINDOWS)}"
+    return metric, window, None
+
+@app.route('/api/seller/leaderboard', methods=['GET'])
+def get_seller_leaderboard():
+    """Get the top sellers by a sustainability metric"""
+    metric, window, error = _leaderboard_args()
+    if error:
+        return jsonify({"error": error}), 400
+    try:
+        limit = int(request.args.get('limit') or Config.LEADERBOARD_DEFAULT_LIMIT)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if not 0 < limit <= Config.LEADERBOARD_MAX_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {Config.LEADERBOARD_MAX_LIMIT}"}), 400
+    try:
+        return jsonify(leaderboard.top(metric, window, limit))
+    except Exception as e:
+        logger.error(f"Error getting seller leaderboard: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/seller/leaderboard/<seller_address>', methods=['GET'])
+def get_seller_rank(seller_address):
+    """Get a seller's rank on the leaderboard"""
+    seller_address = normalize_address(seller_address)
+    if seller_address is None:
+        return jsonify({"error": "Invalid seller address"}), 400
+    metric, window, error = _leaderboard_args()
+    if error:
+        return jsonify({"error": error}), 400
+    try:
+        return jsonify(leaderboard.rank(seller_address, metric, window))
+    except Exception as e:
+        logger.error(f"Error getting seller rank: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/seller/trends/<seller_address>', methods=['GET'])
 def get_seller_trends(seller_address):
     """Get sustainability trends for a specific seller"""
+    seller_address = normalize_address(seller_address)
+    if seller_address is None:
+        return jsonify({"error": "Invalid seller address"}), 400
+    days = _trend_days()
+    if days is None:
+        return jsonify({"error": f"days must be an integer between 1 and {Config.TRENDS_MAX_DAYS}"}), 400
     try:
-        days = int(request.args.get('days', 30))
         trends = seller_sustainability_service.get_seller_trends(seller_address, days)
         return jsonify(trends)
     except Exception as e:
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+ASGI entry point for the WarranChain backend.
+Serves every Flask route from app.py and the sustainability WebSocket protocol
+from a single event loop, so REST, chat and live updates share one ingestor,
+one metrics cache and one WebSocket service per worker process. Across
+workers, one process per host pulls new events from the chain and the rest
+read them from the shared event index.
+
+Run with:  python asgi.py   or   uvicorn asgi:app --workers 4
+"""
+
+import time
+_import_started = time.perf_counter()
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+import uvicorn
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from config import Config
+from app import app as flask_app
+from services.notifications import notification_service
+from services.sustainability import snapshot_refresher
+from services.websocket_service import websocket_service
+
+try:
+    from a2wsgi import WSGIMiddleware
+except ImportError:
+    # Starlette's adapter is deprecated but ships with fastapi
+    from fastapi.middleware.wsgi import WSGIMiddleware
+
+logger = logging.getLogger(__name__)
+
+class ASGIWebSocket:
+    """Adapts a Starlette WebSocket to the send/iterate interface of WebSocketService"""
+
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+
+    async def send(self, message: str):
+        await self.websocket.send_text(message)
+
+    def __aiter__(self):
+        return self.websocket.iter_text()
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Run event monitoring on this worker's loop for the lifetime of the server"""
+    startup_ms = (time.perf_counter() - _import_started) * 1000
+    if startup_ms > Config.STARTUP_BUDGET_MS:
+        logger.warning(f"Worker startup took {startup_ms:.0f} ms, over the "
+                       f"{Config.STARTUP_BUDGET_MS} ms budget")
+    else:
+        logger.info(f"Worker ready in {startup_ms:.0f} ms")
+    # Only one worker per host wins the refresher lock and recomputes snapshots
+    snapshot_refresher.start()
+    notification_service.start()
+    # Every worker pushes events to its clients from the shared index; only the
+    # chain tail leader force-syncs it from Sui on each poll
+    monitor = asyncio.create_task(websocket_service.start_event_monitoring())
+    try:
+        yield
+    finally:
+        snapshot_refresher.stop()
+        notification_service.stop()
+        websocket_service.stop()
+        monitor.cancel()
+
+app = FastAPI(title="WarranChain Backend", lifespan=lifespan, docs_url=None, redoc_url=None)
+
+@app.websocket("/")
+@app.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket):
+    """Sustainability WebSocket protocol, same messages as the standalone server"""
+    await websocket.accept()
+    client = ASGIWebSocket(websocket)
+    await websocket_service.register(client)
+    try:
+        async for message in client:
+            await websocket_service.handle_client_message(client, message)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await websocket_service.unregister(client)
+
+# Everything else is served by the Flask app on a worker thread
+app.mount("/", WSGIMiddleware(flask_app))
+
+def main():
+    """Start the ASGI server"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    logger.info(f"Starting WarranChain backend on http://{Config.SERVER_HOST}:{Config.SERVER_PORT} "
+                f"with {Config.SERVER_WORKERS} worker(s)")
+    # An import string lets uvicorn spawn independent worker processes
+    uvicorn.run(
+        "asgi:app",
+        host=Config.SERVER_HOST,
+        port=Config.SERVER_PORT,
+        workers=Config.SERVER_WORKERS
+    )
+
+if __name__ == "__main__":
+    main()
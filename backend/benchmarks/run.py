@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite for the WarranChain backend.
+Generates a synthetic chain, serves it from a local JSON-RPC stub, ingests
+it through the normal EventIngestor, checks a full rollup rebuild against the
+incremental rollups and drives the sustainability services, trend queries,
+verification and WebSocket fan-out. Reports throughput,
+p50/p99 latency and peak RSS for each scale.
+
+Usage (from backend/):
+    python -m benchmarks.run --events 1000 100000 1000000
+    python -m benchmarks.run --events 10000000 --ingest direct --json results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.stub_rpc import StubRpcClient, StubRpcServer
+from benchmarks.synthetic import SyntheticChain
+from services.cache import MetricsCache
+from services.event_ingestion import EventIngestor
+from services.event_store import EVENT_KINDS, EVENT_NAMES, EventStore
+from services.leaderboard import Leaderboard
+from services.seller_sustainability import SellerSustainabilityService
+from services.sustainability import SustainabilityService
+from services.verification import VerificationService
+from services.websocket_service import WebSocketService
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def measure(name: str, func: Callable[[], object], reps: int, ops_per_call: int = 1) -> Dict:
+    """Call func reps times and summarize its latency"""
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(reps):
+        t = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - t) * 1000)
+    elapsed = time.perf_counter() - started
+    return {
+        "name": name,
+        "calls": reps,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "ops_per_sec": round(reps * ops_per_call / elapsed, 1) if elapsed else 0
+    }
+
+
+class CountingSocket:
+    """Stands in for a client connection and counts delivered messages"""
+
+    def __init__(self):
+        self.received = 0
+
+    async def send(self, message: str):
+        self.received += 1
+
+
+async def websocket_fanout(ingestor: EventIngestor, chain: SyntheticChain,
+                           clients: int, events: int) -> Dict:
+    """Broadcast events to many clients and time until every queue is drained"""
+    service = WebSocketService(ingestor=ingestor)
+    sockets = [CountingSocket() for _ in range(clients)]
+    for socket in sockets:
+        await service.register(socket)
+
+    latencies = []
+    started = time.perf_counter()
+    for i in range(events):
+        event = chain.event("WarrantyTransferred", i)
+        data = {"kind": "transfers", "nft_id": event["parsedJson"]["nft_id"],
+                "owner": event["parsedJson"]["to"], "seller": None}
+        t = time.perf_counter()
+        await service.broadcast_event(EVENT_NAMES["transfers"], data)
+        latencies.append((time.perf_counter() - t) * 1000)
+        await asyncio.sleep(0)
+    # Wait for every writer to drain its queue; full queues drop their oldest messages
+    connections = list(service.clients.values())
+    while any(not c.queue.empty() for c in connections) and time.perf_counter() - started < 60:
+        await asyncio.sleep(0.001)
+    await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+
+    for socket in sockets:
+        await service.unregister(socket)
+    service.stop()
+    delivered = sum(s.received for s in sockets)
+    dropped = sum(c.dropped for c in connections)
+    return {
+        "name": f"ws_fanout_{clients}x{events}",
+        "calls": events,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "ops_per_sec": round((delivered - clients) / elapsed, 1) if elapsed else 0,
+        "dropped": dropped
+    }
+
+
+def ingest_direct(store: EventStore, chain: SyntheticChain, page_size: int):
+    """Write generated pages straight into the index, skipping HTTP"""
+    for kind in EVENT_KINDS:
+        for events, cursor in chain.pages(EVENT_NAMES[kind], page_size):
+            store.store_page(kind, events, cursor)
+
+
+def run_scale(n: int, args) -> Dict:
+    chain = SyntheticChain(n, sellers=args.sellers, end_ms=int(time.time() * 1000))
+    workdir = tempfile.mkdtemp(prefix="warranchain-bench-")
+    store = EventStore(os.path.join(workdir, "events.db"))
+    server = StubRpcServer(chain).start()
+    client = StubRpcClient(server.url)
+    # Sync only when the benchmark asks for it
+    ingestor = EventIngestor(client=client, store=store, min_sync_interval=float("inf"), backend=None)
+    ingestor.fetcher.page_size = args.page_size
+    results = []
+
+    started = time.perf_counter()
+    if args.ingest == "direct":
+        ingest_direct(store, chain, args.page_size)
+    else:
+        ingestor.sync(force=True)
+    elapsed = time.perf_counter() - started
+    results.append({"name": f"ingest_{args.ingest}", "calls": server.requests_served,
+                    "p50_ms": None, "p99_ms": None,
+                    "ops_per_sec": round(store.count() / elapsed, 1) if elapsed else 0})
+
+    started = time.perf_counter()
+    ingestor.get_table()
+    results.append({"name": "table_load", "calls": 1, "p50_ms": round((time.perf_counter() - started) * 1000, 3),
+                    "p99_ms": None, "ops_per_sec": round(store.count() / (time.perf_counter() - started), 1)})
+
+    # Full rebuild, checked against the incrementally maintained rollups
+    started = time.perf_counter()
+    matched = ingestor.table.rebuild_rollups()
+    results.append({"name": "rollup_rebuild", "calls": 1, "p50_ms": round((time.perf_counter() - started) * 1000, 3),
+                    "p99_ms": None, "ops_per_sec": round(store.count() / (time.perf_counter() - started), 1),
+                    "mismatch": not matched})
+
+    cache = MetricsCache(backend=None)
+    sustainability = SustainabilityService(ingestor=ingestor, cache=cache)
+    sellers = SellerSustainabilityService(ingestor=ingestor, cache=cache)
+    verification = VerificationService(ingestor=ingestor)
+    rnd = random.Random(42)
+    seller = lambda: chain.seller(rnd.randrange(chain.sellers))
+    reps = args.reps
+
+    results.append(measure("global_metrics_compute", sustainability._compute_sustainability_metrics, reps))
+    results.append(measure("global_metrics_cached", sustainability.get_sustainability_metrics, reps * 10))
+    results.append(measure("seller_metrics_compute", lambda: sellers._compute_seller_metrics(seller()), reps))
+    results.append(measure("global_trends_30d", lambda: sustainability.get_sustainability_trends(30), reps))
+    results.append(measure("seller_trends_30d", lambda: sellers.get_seller_trends(seller(), 30), reps))
+    results.append(measure("global_trends_365d", lambda: sustainability.get_sustainability_trends(365), reps))
+    results.append(measure("seller_trends_365d", lambda: sellers.get_seller_trends(seller(), 365), reps))
+    results.append(measure("achievements_first_pass", sellers.achievements.refresh, 1))
+    results.append(measure("seller_achievements", lambda: sellers.get_seller_achievements(seller()), reps))
+    board = Leaderboard(ingestor=ingestor, cache=cache)
+    results.append(measure("leaderboard_first_pass", board.refresh, 1))
+    results.append(measure("leaderboard_top10_month", lambda: board.top("ewaste", "month", 10), reps * 10))
+    results.append(measure("leaderboard_rank", lambda: board.rank(seller(), "carbon", "all"), reps * 10))
+    batch_sellers = lambda: sellers.get_many_seller_metrics([seller() for _ in range(200)])
+    results.append(measure("seller_metrics_batch_200", batch_sellers, reps, ops_per_call=200))
+    mints = chain.counts["WarrantyMinted"]
+    batch = lambda: verification.verify_many([chain.nft(rnd.randrange(mints)) for _ in range(args.verify_batch)])
+    results.append(measure(f"verify_batch_{args.verify_batch}", batch, reps, ops_per_call=args.verify_batch))
+    results.append(asyncio.run(websocket_fanout(ingestor, chain, args.ws_clients, args.ws_events)))
+
+    server.shutdown()
+    store.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {"events": chain.total, "peak_rss_mb": peak_rss_mb(), "results": results}
+
+
+def print_report(report: Dict):
+    print(f"\n== {report['events']:,} events  (peak RSS {report['peak_rss_mb']} MB) ==")
+    print(f"{'benchmark':<28}{'calls':>8}{'p50 ms':>12}{'p99 ms':>12}{'ops/s':>14}")
+    for r in report["results"]:
+        p50 = "-" if r["p50_ms"] is None else f"{r['p50_ms']:.3f}"
+        p99 = "-" if r["p99_ms"] is None else f"{r['p99_ms']:.3f}"
+        dropped = f"  ({r['dropped']} dropped)" if r.get("dropped") else ""
+        dropped += "  (MISMATCH with incremental state)" if r.get("mismatch") else ""
+        print(f"{r['name']:<28}{r['calls']:>8}{p50:>12}{p99:>12}{r['ops_per_sec']:>14,.1f}{dropped}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WarranChain backend benchmarks")
+    parser.add_argument("--events", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="total synthetic events per run (10^3 to 10^7)")
+    parser.add_argument("--sellers", type=int, default=100)
+    parser.add_argument("--ingest", choices=["rpc", "direct"], default="rpc",
+                        help="ingest through the stub RPC or write pages straight into the index")
+    parser.add_argument("--page-size", type=int, default=50, help="events per suix_queryEvents page")
+    parser.add_argument("--reps", type=int, default=50, help="calls per latency benchmark")
+    parser.add_argument("--verify-batch", type=int, default=1000)
+    parser.add_argument("--ws-clients", type=int, default=100)
+    parser.add_argument("--ws-events", type=int, default=200)
+    parser.add_argument("--json", help="write the reports to this file")
+    args = parser.parse_args()
+
+    reports = []
+    for n in args.events:
+        report = run_scale(n, args)
+        print_report(report)
+        reports.append(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
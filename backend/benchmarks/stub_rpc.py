@@ -0,0 +1,87 @@
+# stub_rpc.py
+"""Local Sui JSON-RPC stub for the benchmark suite.
+Serves suix_queryEvents and sui_getObject from a SyntheticChain over HTTP,
+together with a minimal client exposing the query_events() call that
+EventFetcher makes, so ingestion is measured through a real socket.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+import requests
+from benchmarks.synthetic import SyntheticChain
+
+
+class StubRpcServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, chain: SyntheticChain, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), StubRpcHandler)
+        self.chain = chain
+        self.requests_served = 0
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubRpcServer":
+        threading.Thread(target=self.serve_forever, name="stub-rpc", daemon=True).start()
+        return self
+
+
+class StubRpcHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        chain: SyntheticChain = self.server.chain
+        self.server.requests_served += 1
+        params = body.get("params", [])
+        method = body.get("method")
+
+        if method == "suix_queryEvents":
+            query, cursor, limit = (params + [None, None, None])[:3]
+            kind = query["MoveEventType"].split("::")[-1]
+            response = {"result": chain.page(kind, cursor, min(limit or 50, 1000))}
+        elif method == "sui_getObject":
+            response = {"result": chain.get_object(params[0])}
+        else:
+            response = {"error": {"code": -32601, "message": f"Method not found: {method}"}}
+
+        payload = json.dumps({"jsonrpc": "2.0", "id": body.get("id"), **response}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubRpcClient:
+    """JSON-RPC client with the query_events() signature EventFetcher uses"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.session = requests.Session()
+        self._next_id = 0
+
+    def _call(self, method: str, params: list) -> Any:
+        self._next_id += 1
+        response = self.session.post(self.url, json={
+            "jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params
+        }, timeout=30)
+        response.raise_for_status()
+        body = response.json()
+        if "error" in body:
+            raise RuntimeError(body["error"].get("message", "RPC error"))
+        return body["result"]
+
+    def query_events(self, query: Dict, cursor: Optional[Dict] = None, limit: int = 50,
+                     descending_order: bool = False) -> Dict:
+        return self._call("suix_queryEvents", [query, cursor, limit, descending_order])
+
+    def get_object(self, object_id: str) -> Dict:
+        return self._call("sui_getObject", [object_id, {"showContent": True}])
@@ -0,0 +1,135 @@
+# synthetic.py
+"""Deterministic synthetic warranty events for the benchmark suite.
+Events are computed from their position, so a stream of 10^7 events can be
+paged without ever being held in memory. Mints come from a fixed set of
+sellers; transfers and repairs target NFTs minted no later than themselves.
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Share of the total event count per kind
+KIND_SHARES = {"WarrantyMinted": 0.6, "WarrantyTransferred": 0.25, "RepairLogged": 0.15}
+# Cursor prefix per kind, e.g. {"txDigest": "m42", "eventSeq": "0"}
+KIND_PREFIX = {"WarrantyMinted": "m", "WarrantyTransferred": "t", "RepairLogged": "r"}
+
+DAY_MS = 86_400_000
+YEAR_MS = 365 * DAY_MS
+
+
+def hex_id(prefix: int, i: int) -> str:
+    """Canonical 0x + 64 hex id, distinct per (prefix, i)"""
+    return "0x" + f"{prefix:08x}{i:056x}"
+
+
+class SyntheticChain:
+    """N synthetic events spread over `span_days` ending at `end_ms`"""
+
+    def __init__(self, events: int, sellers: int = 100, span_days: int = 365,
+                 end_ms: int = 1_760_000_000_000):
+        self.sellers = max(1, sellers)
+        self.counts = {kind: int(events * share) for kind, share in KIND_SHARES.items()}
+        self.counts["WarrantyMinted"] = max(1, events - self.counts["WarrantyTransferred"]
+                                            - self.counts["RepairLogged"])
+        self.end_ms = end_ms
+        self.start_ms = end_ms - span_days * DAY_MS
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def seller(self, i: int) -> str:
+        return hex_id(1, i % self.sellers)
+
+    def owner(self, i: int) -> str:
+        return hex_id(2, i)
+
+    def nft(self, i: int) -> str:
+        return hex_id(3, i)
+
+    def _timestamp(self, kind: str, i: int) -> int:
+        return self.start_ms + (self.end_ms - self.start_ms) * i // max(1, self.counts[kind])
+
+    def _target(self, kind: str, i: int, salt: int) -> int:
+        """An NFT index spread pseudo-randomly over the mints up to event i's timestamp"""
+        mints = self.counts["WarrantyMinted"]
+        # Mint j is stamped at or before event i exactly when j <= i * mints / count
+        minted = min(mints, i * mints // max(1, self.counts[kind]) + 1)
+        return (i * 2654435761 + salt) % minted
+
+    def event(self, kind: str, i: int) -> Dict:
+        """The i-th event of one kind, shaped like a suix_queryEvents item"""
+        ts = self._timestamp(kind, i)
+        if kind == "WarrantyMinted":
+            sender = self.seller(i)
+            parsed = {
+                "nft_id": self.nft(i),
+                "owner": self.owner(i),
+                "serial_number": f"SN{i:010d}",
+                "product_name": f"Product {i % 50}",
+                "manufacturer": f"Maker {i % 7}",
+                "expiry_date": str(ts + YEAR_MS)
+            }
+        elif kind == "WarrantyTransferred":
+            target = self._target(kind, i, 17)
+            sender = self.owner(target)
+            parsed = {
+                "nft_id": self.nft(target),
+                "from": sender,
+                "to": hex_id(4, i),
+                "timestamp": str(ts)
+            }
+        else:
+            target = self._target(kind, i, 91)
+            sender = self.owner(target)
+            parsed = {
+                "nft_id": self.nft(target),
+                "repair_description": "Screen replacement",
+                "repair_date": str(ts),
+                "logged_by": sender
+            }
+        return {
+            "id": {"txDigest": f"{KIND_PREFIX[kind]}{i}", "eventSeq": "0"},
+            "type": kind,
+            "sender": sender,
+            "timestampMs": str(ts),
+            "parsedJson": parsed
+        }
+
+    def page(self, kind: str, cursor: Optional[Dict], limit: int) -> Dict:
+        """One suix_queryEvents result page after cursor, in ascending order"""
+        start = int(cursor["txDigest"][1:]) + 1 if cursor else 0
+        end = min(start + limit, self.counts[kind])
+        data = [self.event(kind, i) for i in range(start, end)]
+        return {
+            "data": data,
+            "nextCursor": data[-1]["id"] if data else cursor,
+            "hasNextPage": end < self.counts[kind]
+        }
+
+    def pages(self, kind: str, limit: int) -> Iterator[Tuple[List[Dict], Dict]]:
+        """Every page of one kind as (events, next_cursor)"""
+        cursor = None
+        while True:
+            page = self.page(kind, cursor, limit)
+            if page["data"]:
+                yield page["data"], page["nextCursor"]
+            if not page["hasNextPage"]:
+                break
+            cursor = page["nextCursor"]
+
+    def get_object(self, object_id: str) -> Dict:
+        """sui_getObject-style view of a synthetic NFT"""
+        try:
+            i = int(object_id[10:], 16) if object_id.startswith("0x00000003") else -1
+        except ValueError:
+            i = -1
+        if not 0 <= i < self.counts["WarrantyMinted"]:
+            return {"error": {"code": "notExists", "object_id": object_id}}
+        mint = self.event("WarrantyMinted", i)["parsedJson"]
+        return {
+            "data": {
+                "objectId": object_id,
+                "version": "1",
+                "type": "WarrantyNFT",
+                "content": {"dataType": "moveObject", "fields": mint}
+            }
+        }
@@ -25,6 +25,31 @@ class Config:
         "REPAIR_LOGGED": f"{NFT_PACKAGE_ID}::{MODULE_NAME}::RepairLogged"
     }
     
+    # Local event index
+    EVENT_STORE_PATH = os.getenv("EVENT_STORE_PATH", "warranty_events.db")
+    EVENT_PAGE_SIZE = int(os.getenv("EVENT_PAGE_SIZE", "50"))
+    EVENT_FETCH_CONCURRENCY = int(os.getenv("EVENT_FETCH_CONCURRENCY", "3"))  # event types fetched in parallel
+    EVENT_FETCH_MAX_RETRIES = int(os.getenv("EVENT_FETCH_MAX_RETRIES", "3"))
+    EVENT_FETCH_BACKOFF = float(os.getenv("EVENT_FETCH_BACKOFF", "0.5"))  # seconds, doubled per retry
+    EVENT_SYNC_INTERVAL = float(os.getenv("EVENT_SYNC_INTERVAL", "15"))  # seconds between chain pulls
+    EVENT_SYNC_LEASE = float(os.getenv("EVENT_SYNC_LEASE", "300"))  # seconds one worker may hold the sync lock
+    TRENDS_MAX_DAYS = int(os.getenv("TRENDS_MAX_DAYS", "3650"))  # longest ?days= window for trend series
+    
+    # Metrics cache
+    CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))  # seconds before an entry is stale
+    CACHE_FORCE_REFRESH_INTERVAL = float(os.getenv("CACHE_FORCE_REFRESH_INTERVAL", "30"))  # min seconds between ?refresh=true
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+    CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))  # approximate, by JSON size
+    CACHE_MAX_STALE = float(os.getenv("CACHE_MAX_STALE", "3600"))  # seconds an entry may be served stale
+    
+    # WebSocket live updates
+    WS_POLL_INTERVAL = float(os.getenv("WS_POLL_INTERVAL", "1"))  # seconds between chain polls
+    WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "100"))  # per client; oldest dropped when full
+    WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))  # seconds before a stalled socket is dropped
+    WS_EXECUTOR_WORKERS = int(os.getenv("WS_EXECUTOR_WORKERS", "4"))  # threads for blocking Sui/index calls
+    WS_BLOCKING_TIMEOUT = float(os.getenv("WS_BLOCKING_TIMEOUT", "30"))  # seconds
+    WS_SNAPSHOT_INTERVAL = float(os.getenv("WS_SNAPSHOT_INTERVAL", "60"))  # seconds between full metric snapshots
+    
     # Firebase Configuration
     FIREBASE_CRED_PATH = os.getenv("FIREBASE_CRED_PATH", "firebase-creds.json")
     
@@ -32,4 +57,57 @@ class Config:
     DEBUG = os.getenv("DEBUG", "False") == "True"
     
     # Chatbot Configuration
-    OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "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")
\ No newline at end of file
+    OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "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")
+    OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+    CHAT_MODEL = os.getenv("CHAT_MODEL", "deepseek/deepseek-r1-0528:free")
+    CHAT_POOL_SIZE = int(os.getenv("CHAT_POOL_SIZE", "10"))  # keep-alive connections to the LLM API
+    CHAT_CONNECT_TIMEOUT = float(os.getenv("CHAT_CONNECT_TIMEOUT", "5"))  # seconds
+    CHAT_READ_TIMEOUT = float(os.getenv("CHAT_READ_TIMEOUT", "60"))  # seconds between bytes from the model
+    CHAT_CACHE_TTL = int(os.getenv("CHAT_CACHE_TTL", "3600"))  # seconds a cached reply stays valid
+    CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "1000"))
+    CHAT_CACHE_SIMILARITY = float(os.getenv("CHAT_CACHE_SIMILARITY", "0"))  # trigram Jaccard threshold, 0 disables
+    
+    # ASGI Server Configuration
+    SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT = int(os.getenv("SERVER_PORT", "5000"))
+    SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))  # each worker runs its own event loop and services
+    
+    # Shared Snapshot Configuration (one computation per host across workers)
+    SNAPSHOT_BACKEND = os.getenv("SNAPSHOT_BACKEND", "file")  # file, redis or none
+    SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "warranty_snapshots")
+    SNAPSHOT_REDIS_URL = os.getenv("SNAPSHOT_REDIS_URL", "redis://localhost:6379/0")
+    SNAPSHOT_REFRESH_INTERVAL = int(os.getenv("SNAPSHOT_REFRESH_INTERVAL", "60"))  # seconds
+    # Key prefixes shared across workers; per-address metrics stay process-local
+    SNAPSHOT_SHARED_KEYS = tuple(
+        p.strip() for p in os.getenv("SNAPSHOT_SHARED_KEYS", "sustainability_metrics,leaderboard_").split(",") if p.strip()
+    )
+    STARTUP_BUDGET_MS = int(os.getenv("STARTUP_BUDGET_MS", "1500"))  # import-to-ready time allowed per worker
+    
+    # Expiry Notification Configuration
+    NOTIFY_SENDER = os.getenv("NOTIFY_SENDER", "fake")  # firebase or fake
+    NOTIFY_LEAD_DAYS = int(os.getenv("NOTIFY_LEAD_DAYS", "7"))  # matches is_expiring_soon in the contract
+    NOTIFY_INTERVAL = int(os.getenv("NOTIFY_INTERVAL", "60"))  # seconds between scheduler ticks
+    NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "500"))  # FCM send_each limit
+    NOTIFY_RATE_PER_SEC = float(os.getenv("NOTIFY_RATE_PER_SEC", "500"))  # 0 disables rate limiting
+    NOTIFY_MAX_PER_TICK = int(os.getenv("NOTIFY_MAX_PER_TICK", "100000"))
+    NOTIFY_RETRY_DELAY = int(os.getenv("NOTIFY_RETRY_DELAY", "300"))  # seconds before a failed batch is retried
+    
+    # Verification Configuration
+    VERIFY_CACHE_MAX_ENTRIES = int(os.getenv("VERIFY_CACHE_MAX_ENTRIES", "100000"))
+    VERIFY_BATCH_MAX = int(os.getenv("VERIFY_BATCH_MAX", "5000"))  # ids per batch request
+    
+    # Seller Batch Configuration
+    SELLER_BATCH_MAX = int(os.getenv("SELLER_BATCH_MAX", "1000"))  # addresses per batch request
+    
+    # Leaderboard Configuration
+    LEADERBOARD_DEFAULT_LIMIT = int(os.getenv("LEADERBOARD_DEFAULT_LIMIT", "10"))
+    LEADERBOARD_MAX_LIMIT = int(os.getenv("LEADERBOARD_MAX_LIMIT", "100"))  # longest top list served and cached
+    
+    # Event Export Configuration
+    EVENTS_PAGE_LIMIT = int(os.getenv("EVENTS_PAGE_LIMIT", "1000"))  # events per page by default
+    EVENTS_PAGE_MAX = int(os.getenv("EVENTS_PAGE_MAX", "100000"))
+    EVENTS_STREAM_CHUNK = int(os.getenv("EVENTS_STREAM_CHUNK", "500"))  # rows read from the index at a time
+    
+    # Instrumentation Configuration
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "False") == "True"  # allow ?profile=1 on requests
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))  # seconds between stack samples
@@ -0,0 +1,259 @@
+# cache.py
+"""Metrics cache shared by the WarranChain sustainability services.
+This module provides a stale-while-revalidate cache: expired entries keep
+being served while exactly one background refresh runs per key, forced
+refreshes are rate-limited, and hit/miss/refresh-latency counters are kept.
+Entries are bounded by count and approximate size with LRU+TTL eviction.
+With a snapshot backend, refreshes of the global keys go through a host-wide
+store so worker processes share one computed value instead of each
+recomputing it; per-address keys stay in process memory.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from config import Config
+from services.instrumentation import registry
+from services.snapshot_store import get_snapshot_backend
+
+
+def _approx_size(value: Any) -> int:
+    """Approximate memory cost of a cached value by its JSON length"""
+    try:
+        return len(json.dumps(value, default=str))
+    except (TypeError, ValueError):
+        return 1024
+
+
+class MetricsCache:
+    """Stale-while-revalidate LRU cache with single-flight refresh per key.
+
+    Entries older than `max_stale` are dropped instead of served stale, and the
+    least recently used entries are evicted beyond `max_entries`/`max_bytes`.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, min_force_interval: Optional[float] = None,
+                 max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 max_stale: Optional[float] = None, wait_timeout: float = 60, backend=None,
+                 shared_keys: Optional[Tuple[str, ...]] = None):
+        self.ttl = Config.CACHE_TTL if ttl is None else ttl
+        if min_force_interval is None:
+            min_force_interval = Config.CACHE_FORCE_REFRESH_INTERVAL
+        self.min_force_interval = min_force_interval
+        self.max_entries = max_entries or Config.CACHE_MAX_ENTRIES
+        self.max_bytes = max_bytes or Config.CACHE_MAX_BYTES
+        self.max_stale = Config.CACHE_MAX_STALE if max_stale is None else max_stale
+        self.wait_timeout = wait_timeout
+        # Optional host-wide snapshot store (services.snapshot_store), or a
+        # factory for one that is called on first use
+        self._backend = backend
+        self._backend_resolved = not callable(backend)
+        # Only keys with these prefixes go to the backend, which keeps it bounded
+        self.shared_keys = Config.SNAPSHOT_SHARED_KEYS if shared_keys is None else tuple(shared_keys)
+        # key -> (stored_at, value, approximate size), least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, threading.Event] = {}
+        self._last_forced: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "forced_refreshes": 0,
+            "forced_refreshes_throttled": 0,
+            "evictions_lru": 0,
+            "evictions_expired": 0,
+            "shared_hits": 0,
+            "shared_writes": 0,
+            "refresh_seconds_total": 0.0,
+            "refresh_seconds_max": 0.0,
+            "refresh_seconds_last": 0.0
+        }
+
+    @property
+    def backend(self):
+        if not self._backend_resolved:
+            with self._lock:
+                if not self._backend_resolved:
+                    self._backend = self._backend()
+                    self._backend_resolved = True
+        return self._backend
+
+    def _load(self, key: str, compute: Callable[[], Any], force: bool) -> Tuple[Any, float]:
+        """Fresh value for key with its timestamp, computed at most once per host"""
+        backend = self.backend
+        if backend is None or not key.startswith(self.shared_keys):
+            return compute(), time.time()
+
+        requested = time.time()
+        if not force:
+            shared = backend.read(key)
+            if shared is not None and requested - shared[0] < self.ttl:
+                self._count("shared_hits")
+                return shared[1], shared[0]
+
+        handle = backend.acquire(key, lease=self.wait_timeout)
+        if handle is None:
+            # Another worker is computing this key; wait for its snapshot
+            deadline = requested + self.wait_timeout
+            while time.time() < deadline:
+                time.sleep(0.05)
+                shared = backend.read(key)
+                if shared is not None and shared[0] >= requested - (0 if force else self.ttl):
+                    self._count("shared_hits")
+                    return shared[1], shared[0]
+            return compute(), time.time()
+
+        try:
+            if not force:
+                shared = backend.read(key)
+                if shared is not None and time.time() - shared[0] < self.ttl:
+                    self._count("shared_hits")
+                    return shared[1], shared[0]
+            value = compute()
+            stored_at = time.time()
+            backend.write(key, value, stored_at)
+            self._count("shared_writes")
+            return value, stored_at
+        finally:
+            backend.release(handle)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def publish(self, key: str, compute: Callable[[], Any]):
+        """Recompute key and write it to the shared backend (designated refresher)"""
+        value = compute()
+        stored_at = time.time()
+        if self.backend is not None and key.startswith(self.shared_keys):
+            self.backend.write(key, value, stored_at)
+            self._count("shared_writes")
+        with self._lock:
+            self._store(key, value, stored_at)
+
+    def _refresh(self, key: str, compute: Callable[[], Any], force: bool = False) -> Optional[Exception]:
+        """Recompute one key; runs on exactly one thread per key at a time"""
+        started = time.perf_counter()
+        error = None
+        try:
+            value, stored_at = self._load(key, compute, force)
+            with self._lock:
+                self._store(key, value, stored_at)
+        except Exception as e:
+            error = e
+            print(f"Cache refresh error for {key}: {str(e)}")
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._stats["refreshes"] += 1
+                if error is not None:
+                    self._stats["refresh_errors"] += 1
+                self._stats["refresh_seconds_total"] += elapsed
+                self._stats["refresh_seconds_last"] = elapsed
+                self._stats["refresh_seconds_max"] = max(self._stats["refresh_seconds_max"], elapsed)
+                self._inflight.pop(key).set()
+        return error
+
+    def _store(self, key: str, value: Any, stored_at: Optional[float] = None):
+        """Insert under the lock, then evict down to the configured bounds"""
+        self._drop(key)
+        size = _approx_size(value)
+        self._entries[key] = (stored_at or time.time(), value, size)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            if oldest == key:
+                break
+            self._drop(oldest)
+            self._stats["evictions_lru"] += 1
+
+    def _drop(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[2]
+        return True
+
+    def get(self, key: str, compute: Callable[[], Any], force_refresh: bool = False) -> Any:
+        """Return the cached value for key, computing it at most once concurrently"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] >= self.max_stale:
+                # Too old to serve even as stale data
+                self._drop(key)
+                self._stats["evictions_expired"] += 1
+                entry = None
+            if force_refresh:
+                if now - self._last_forced.get(key, 0) < self.min_force_interval:
+                    force_refresh = False
+                    self._stats["forced_refreshes_throttled"] += 1
+                else:
+                    if len(self._last_forced) >= self.max_entries:
+                        cutoff = now - self.min_force_interval
+                        self._last_forced = {k: t for k, t in self._last_forced.items() if t >= cutoff}
+                    self._last_forced[key] = now
+                    self._stats["forced_refreshes"] += 1
+
+            if entry is not None and not force_refresh:
+                self._entries.move_to_end(key)
+                if now - entry[0] < self.ttl:
+                    self._stats["hits"] += 1
+                    return entry[1]
+                # Serve stale data while one background refresh runs
+                self._stats["stale_hits"] += 1
+                if key not in self._inflight:
+                    self._inflight[key] = threading.Event()
+                    threading.Thread(target=self._refresh, args=(key, compute), daemon=True).start()
+                return entry[1]
+
+            self._stats["misses"] += 1
+            waiter = self._inflight.get(key)
+            if waiter is None:
+                self._inflight[key] = threading.Event()
+
+        if waiter is None:
+            error = self._refresh(key, compute, force_refresh)
+            if error is not None:
+                raise error
+        else:
+            waiter.wait(self.wait_timeout)
+
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            raise RuntimeError(f"No value available for {key}")
+        return entry[1]
+
+    def invalidate(self, key: Optional[str] = None):
+        """Drop one key, or every key"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                self._drop(key)
+
+    def stats(self) -> Dict:
+        """Snapshot of the cache counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["approx_bytes"] = self._bytes
+            stats["max_entries"] = self.max_entries
+            stats["max_bytes"] = self.max_bytes
+            stats["refreshes_in_flight"] = len(self._inflight)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 4) if lookups else 0
+        return stats
+
+
+# Global cache shared by the sustainability services and, through the
+# snapshot backend, by every worker process on the host
+metrics_cache = MetricsCache(backend=get_snapshot_backend)
+registry.register_collector("warranchain_metrics_cache", metrics_cache.stats)
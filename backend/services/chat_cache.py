@@ -0,0 +1,158 @@
+# chat_cache.py
+"""Response cache for common chatbot questions.
+This module keys chatbot replies on the whole normalized conversation,
+answering repeats by exact match and, when enabled, near-repeats by
+character trigram similarity, with TTL and LRU eviction and hit-rate
+counters.
+"""
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+from config import Config
+from services.instrumentation import registry
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    text = _NON_WORD.sub(" ", str(text).lower())
+    return _SPACES.sub(" ", text).strip()
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of a normalized string, padded at the word edges"""
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ChatResponseCache:
+    """LRU+TTL cache of chatbot replies with optional similarity lookup.
+
+    The key covers every message, so a follow-up question only matches the
+    same conversation. A `similarity` of 0 (the default) disables fuzzy
+    matching; otherwise the best cached key whose trigram Jaccard similarity
+    reaches the threshold is served. Trigrams barely change under negation
+    ("can I" / "can't I"), so only enable it with a high threshold.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: Optional[int] = None,
+                 similarity: Optional[float] = None):
+        self.ttl = Config.CHAT_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or Config.CHAT_CACHE_MAX_ENTRIES
+        self.similarity = Config.CHAT_CACHE_SIMILARITY if similarity is None else similarity
+        # key -> (stored_at, response, trigrams), least recently used first
+        self._entries: "OrderedDict[str, Tuple[float, str, Set[str]]]" = OrderedDict()
+        # trigram -> keys containing it, for candidate lookup
+        self._postings: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "exact_hits": 0,
+            "similar_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions_lru": 0,
+            "evictions_expired": 0
+        }
+
+    def make_key(self, messages: List[Dict]) -> Optional[str]:
+        """Normalized conversation, or None if it does not end with a user turn"""
+        if not messages or messages[-1].get("role") != "user":
+            return None
+        key = "\n".join(f"{m.get('role')}: {normalize_text(m.get('content', ''))}" for m in messages)
+        return key if normalize_text(messages[-1].get("content", "")) else None
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for gram in entry[2]:
+            keys = self._postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._postings[gram]
+
+    def _live(self, key: str, now: float) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if now - entry[0] >= self.ttl:
+            self._drop(key)
+            self._stats["evictions_expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _closest(self, key: str, grams: Set[str]) -> Optional[str]:
+        """Cached key with the highest trigram Jaccard similarity above the threshold"""
+        overlap = Counter()
+        for gram in grams:
+            overlap.update(self._postings.get(gram, ()))
+        best, best_score = None, self.similarity
+        for candidate, shared in overlap.items():
+            union = len(grams) + len(self._entries[candidate][2]) - shared
+            score = shared / union if union else 0
+            if score >= best_score:
+                best, best_score = candidate, score
+        return best
+
+    def get(self, messages: List[Dict]) -> Optional[str]:
+        """Cached reply for the conversation, if any"""
+        key = self.make_key(messages)
+        if key is None:
+            return None
+        now = time.time()
+        with self._lock:
+            response = self._live(key, now)
+            if response is not None:
+                self._stats["exact_hits"] += 1
+                return response
+            if self.similarity > 0:
+                candidate = self._closest(key, trigrams(key))
+                response = self._live(candidate, now) if candidate else None
+                if response is not None:
+                    self._stats["similar_hits"] += 1
+                    return response
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, messages: List[Dict], response: str):
+        """Store a reply for the conversation tail"""
+        key = self.make_key(messages)
+        if key is None or not response:
+            return
+        grams = trigrams(key)
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (time.time(), response, grams)
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(key)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions_lru"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._postings.clear()
+
+    def stats(self) -> Dict:
+        """Snapshot of the cache counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["max_entries"] = self.max_entries
+        lookups = stats["exact_hits"] + stats["similar_hits"] + stats["misses"]
+        hits = stats["exact_hits"] + stats["similar_hits"]
+        stats["hit_rate"] = round(hits / lookups, 4) if lookups else 0
+        return stats
+
+
+# Global cache in front of the chatbot
+chat_cache = ChatResponseCache()
+registry.register_collector("warranchain_chat_cache", chat_cache.stats)
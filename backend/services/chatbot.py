@@ -1,11 +1,38 @@
 # chatbot.py
 """Chatbot service for WarranChain backend.
 This module handles interactions with the OpenRouter API to provide chatbot responses.
+Requests go through one pooled keep-alive session with connect/read timeouts,
+and replies can be streamed token by token. Repeated questions are answered
+from services.chat_cache without calling the model.
 """
 import os
+import time
 import requests
 import json
+from requests.adapters import HTTPAdapter
 from config import Config
+from services.chat_cache import chat_cache
+from services.instrumentation import registry
+
+upstream_seconds = registry.histogram(
+    "warranchain_chat_upstream_seconds", "Latency of chat completion calls to the LLM API", ["mode"]
+)
+first_token_seconds = registry.histogram(
+    "warranchain_chat_first_token_seconds", "Time until the first streamed token arrives"
+)
+upstream_errors = registry.counter(
+    "warranchain_chat_upstream_errors_total", "Failed chat completion calls", ["mode"]
+)
+
+def _create_session() -> requests.Session:
+    """Pooled HTTP session so chat calls reuse TLS connections"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=Config.CHAT_POOL_SIZE)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+_session = _create_session()
 
 class ChatService:
     SYSTEM_PROMPT = """You are a warranty assistant for a blockchain-based warranty system. 
@@ -27,8 +54,10 @@ class ChatService:
     Always respond concisely and helpfully.
     """
 
+    FALLBACK_RESPONSE = "I'm having trouble connecting to the warranty service. Please try again later."
+
     @staticmethod
-    def get_chat_response(messages):
+    def _build_request(messages, stream=False):
         headers = {
             "Authorization": f"Bearer {Config.OPENROUTER_API_KEY}",
             "Content-Type": "application/json"
@@ -39,20 +68,82 @@ class ChatService:
         formatted_messages += [{"role": msg["role"], "content": msg["content"]} for msg in messages]
 
         payload = {
-            "model": "deepseek/deepseek-r1-0528:free",
+            "model": Config.CHAT_MODEL,
             "messages": formatted_messages,
             "temperature": 0.3,
             "max_tokens": 500
         }
+        if stream:
+            payload["stream"] = True
+        return f"{Config.OPENROUTER_BASE_URL}/chat/completions", headers, payload
+
+    @staticmethod
+    def get_chat_response(messages):
+        cached = chat_cache.get(messages)
+        if cached is not None:
+            return cached
+
+        url, headers, payload = ChatService._build_request(messages)
 
         try:
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers=headers,
-                data=json.dumps(payload)
-            )
-            response.raise_for_status()
-            return response.json()["choices"][0]["message"]["content"]
+            with upstream_seconds.time(mode="blocking"):
+                response = _session.post(
+                    url,
+                    headers=headers,
+                    data=json.dumps(payload),
+                    timeout=(Config.CHAT_CONNECT_TIMEOUT, Config.CHAT_READ_TIMEOUT)
+                )
+                response.raise_for_status()
+                content = response.json()["choices"][0]["message"]["content"]
+            chat_cache.put(messages, content)
+            return content
         except Exception as e:
+            upstream_errors.inc(mode="blocking")
             print(f"API Error: {str(e)}")
-            return "I'm having trouble connecting to the warranty service. Please try again later."
\ No newline at end of file
+            return ChatService.FALLBACK_RESPONSE
+
+    @staticmethod
+    def stream_chat_response(messages):
+        """Yield response tokens as the upstream model produces them"""
+        cached = chat_cache.get(messages)
+        if cached is not None:
+            yield cached
+            return
+
+        url, headers, payload = ChatService._build_request(messages, stream=True)
+        tokens = []
+        started = time.perf_counter()
+
+        try:
+            with _session.post(
+                url,
+                headers=headers,
+                data=json.dumps(payload),
+                timeout=(Config.CHAT_CONNECT_TIMEOUT, Config.CHAT_READ_TIMEOUT),
+                stream=True
+            ) as response:
+                response.raise_for_status()
+                # Byte lines: SSE is UTF-8 but arrives without a charset, so
+                # decode_unicode would fall back to ISO-8859-1
+                for raw in response.iter_lines():
+                    # SSE comments (": keep-alive") and blank separators carry no data
+                    if not raw or not raw.startswith(b"data:"):
+                        continue
+                    data = raw[len(b"data:"):].decode("utf-8").strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    if chunk.get("error"):
+                        raise RuntimeError(chunk["error"].get("message", "Upstream error"))
+                    choices = chunk.get("choices") or [{}]
+                    token = (choices[0].get("delta") or {}).get("content")
+                    if token:
+                        if not tokens:
+                            first_token_seconds.observe(time.perf_counter() - started)
+                        tokens.append(token)
+                        yield token
+        except Exception:
+            upstream_errors.inc(mode="stream")
+            raise
+        upstream_seconds.observe(time.perf_counter() - started, mode="stream")
+        chat_cache.put(messages, "".join(tokens))
@@ -0,0 +1,95 @@
+# event_fetcher.py
+"""Paginated, concurrent fetching of warranty events from the Sui RPC node.
+This module pages through each event type with next_cursor/has_next_page and
+runs the event types in parallel on a bounded thread pool, retrying failed
+pages with exponential backoff.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from config import Config
+from services.event_store import EVENT_KINDS, EventStore, page_parts
+from services.instrumentation import registry
+
+logger = logging.getLogger(__name__)
+
+rpc_seconds = registry.histogram(
+    "warranchain_rpc_seconds", "Latency of Sui RPC event page requests", ["kind"]
+)
+rpc_retries = registry.counter(
+    "warranchain_rpc_retries_total", "Sui RPC event page requests that were retried", ["kind"]
+)
+events_ingested = registry.counter(
+    "warranchain_events_ingested_total", "New events written to the local index", ["kind"]
+)
+
+
+class EventFetcher:
+    """Pulls new pages for every event type into an EventStore"""
+
+    def __init__(self, client, concurrency: Optional[int] = None, page_size: Optional[int] = None,
+                 max_retries: Optional[int] = None, backoff: Optional[float] = None):
+        self.client = client
+        self.concurrency = concurrency or Config.EVENT_FETCH_CONCURRENCY
+        self.page_size = page_size or Config.EVENT_PAGE_SIZE
+        self.max_retries = Config.EVENT_FETCH_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = Config.EVENT_FETCH_BACKOFF if backoff is None else backoff
+
+    def fetch_page(self, query: Dict, cursor: Any) -> Tuple[List, Any, bool]:
+        """Fetch one page, retrying with exponential backoff"""
+        attempt = 0
+        kind = query.get("MoveEventType", "").split("::")[-1]
+        while True:
+            try:
+                with rpc_seconds.time(kind=kind):
+                    page = self.client.query_events(
+                        query=query,
+                        cursor=cursor,
+                        limit=self.page_size,
+                        descending_order=False
+                    )
+                if hasattr(page, "is_ok") and not page.is_ok():
+                    raise RuntimeError(getattr(page, "result_string", "query_events failed"))
+                return page_parts(page)
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                rpc_retries.inc(kind=kind)
+                delay = self.backoff * (2 ** attempt)
+                logger.warning(f"Retrying event page in {delay:.1f}s: {str(e)}")
+                time.sleep(delay)
+                attempt += 1
+
+    def iter_pages(self, kind: str, cursor: Any = None) -> Iterator[Tuple[List, Any]]:
+        """Yield (events, next_cursor) for every page after cursor"""
+        query = {"MoveEventType": Config.EVENT_TYPES[EVENT_KINDS[kind]]}
+        while True:
+            data, next_cursor, has_next_page = self.fetch_page(query, cursor)
+            yield data, next_cursor
+            if not has_next_page or not data or next_cursor is None:
+                break
+            cursor = next_cursor
+
+    def sync_kind(self, store: EventStore, kind: str) -> int:
+        """Ingest every page newer than the saved cursor for one event type"""
+        inserted = 0
+        for data, next_cursor in self.iter_pages(kind, store.get_cursor(kind)):
+            inserted += store.store_page(kind, data, next_cursor)
+        events_ingested.inc(inserted, kind=kind)
+        return inserted
+
+    def sync(self, store: EventStore) -> Dict[str, int]:
+        """Ingest all event types in parallel, returning rows added per type"""
+        added = {kind: 0 for kind in EVENT_KINDS}
+        if self.client is None:
+            return added
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            futures = {kind: pool.submit(self.sync_kind, store, kind) for kind in EVENT_KINDS}
+            for kind, future in futures.items():
+                try:
+                    added[kind] = future.result()
+                except Exception as e:
+                    logger.warning(f"Error syncing {kind} events: {str(e)}")
+        return added
@@ -0,0 +1,153 @@
+# event_ingestion.py
+"""Shared warranty event ingestion for the WarranChain backend.
+This module owns the Sui client and the local event index used by both the
+global and the seller sustainability services, so chain history is pulled
+once per host no matter how many sellers are queried or workers run. Nothing
+touches pysui, the Sui config or the index until the first request needs it.
+"""
+import threading
+import time
+from typing import Dict, Optional
+from config import Config
+from services.event_fetcher import EventFetcher
+from services.event_store import EventStore
+from services.event_table import EventTable
+from services.snapshot_store import get_snapshot_backend
+
+
+_client_lock = threading.Lock()
+_shared_client = None
+_client_created = False
+
+
+def _create_sui_client():
+    """Initialize Sui client with minimal configuration"""
+    try:
+        from pysui.sui.sui_clients import sync_client
+        from pysui.sui.sui_config import SuiConfig
+        config = SuiConfig.default_config()
+        config.rpc_url = Config.SUI_RPC_URL
+        return sync_client(config)
+    except Exception as e:
+        print(f"Warning: Could not initialize Sui client: {e}")
+        return None
+
+
+def get_sui_client():
+    """Process-wide Sui client, created on first use and shared by every ingestor"""
+    global _shared_client, _client_created
+    with _client_lock:
+        if not _client_created:
+            _shared_client = _create_sui_client()
+            _client_created = True
+        return _shared_client
+
+
+class EventIngestor:
+    """Pulls new warranty events into the local index and serves reads from it.
+
+    The client, store and fetcher are built on first use; pass them in to
+    share them or to run without a Sui config. With a snapshot backend, a
+    sync takes the host-wide "ingest" lock and skips when another worker
+    synced within the interval, so workers share one stream of Sui queries
+    and read what it stored from the common index.
+    """
+
+    def __init__(self, client=None, store: Optional[EventStore] = None,
+                 min_sync_interval: Optional[float] = None, backend=get_snapshot_backend):
+        self._client = client
+        # Snapshot backend or a factory for one, resolved on first sync
+        self._backend = backend
+        self._backend_resolved = not callable(backend)
+        self._store = store
+        self._fetcher: Optional[EventFetcher] = None
+        self.table = EventTable()
+        if min_sync_interval is None:
+            min_sync_interval = Config.EVENT_SYNC_INTERVAL
+        self.min_sync_interval = min_sync_interval
+        self.last_sync = 0.0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._init_lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = get_sui_client()
+        return self._client
+
+    @property
+    def store(self) -> EventStore:
+        if self._store is None:
+            with self._init_lock:
+                if self._store is None:
+                    self._store = EventStore()
+        return self._store
+
+    @property
+    def backend(self):
+        if not self._backend_resolved:
+            with self._init_lock:
+                if not self._backend_resolved:
+                    self._backend = self._backend()
+                    self._backend_resolved = True
+        return self._backend
+
+    @property
+    def fetcher(self) -> EventFetcher:
+        if self._fetcher is None:
+            self._fetcher = EventFetcher(self.client)
+        return self._fetcher
+
+    def sync(self, force: bool = False) -> Dict[str, int]:
+        """Ingest new events unless a sync ran within the last interval on this host"""
+        with self._lock:
+            if not force and time.time() - self.last_sync < self.min_sync_interval:
+                return {}
+            self.last_sync = time.time()
+
+        # One sync at a time; concurrent callers just read what is stored
+        if not self._sync_lock.acquire(blocking=False):
+            return {}
+        try:
+            backend = self.backend
+            if backend is None:
+                return self._pull()
+            handle = backend.acquire("ingest", lease=Config.EVENT_SYNC_LEASE)
+            if handle is None:
+                # Another worker is syncing into the shared index
+                return {}
+            try:
+                last = backend.read("ingest_last_sync")
+                if not force and last is not None and time.time() - last[0] < self.min_sync_interval:
+                    # Another worker synced recently; wait out the interval from its sync
+                    with self._lock:
+                        self.last_sync = last[0]
+                    return {}
+                result = self._pull()
+                backend.write("ingest_last_sync", None, time.time())
+                return result
+            finally:
+                backend.release(handle)
+        finally:
+            self._sync_lock.release()
+
+    def _pull(self) -> Dict[str, int]:
+        if self.client is None:
+            print("Warning: Sui client not initialized, serving stored events only")
+            return {}
+        return self.fetcher.sync(self.store)
+
+    def get_table(self, sync: bool = True) -> EventTable:
+        """Columnar view of the stored events, caught up with the index.
+
+        With `sync` off, only rows other workers already stored are read.
+        """
+        if sync:
+            self.sync()
+        self.table.refresh(self.store)
+        return self.table
+
+
+# Global ingestion layer shared by the sustainability services
+event_ingestor = EventIngestor()
@@ -0,0 +1,341 @@
+# event_store.py
+"""Local persistent index of warranty events for the WarranChain backend.
+This module keeps WarrantyMinted, WarrantyTransferred and RepairLogged events
+in an embedded SQLite database together with the last cursor seen for each
+event type, so only new pages have to be pulled from the Sui RPC node.
+Fetching itself lives in services.event_fetcher.
+"""
+import json
+import re
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from config import Config
+
+# Maps the event list names used by the services to Config.EVENT_TYPES keys
+EVENT_KINDS = {
+    "mints": "WARRANTY_MINTED",
+    "transfers": "WARRANTY_TRANSFERRED",
+    "repairs": "REPAIR_LOGGED"
+}
+
+# Move struct name of each event kind, as shown to API clients
+EVENT_NAMES = {
+    "mints": "WarrantyMinted",
+    "transfers": "WarrantyTransferred",
+    "repairs": "RepairLogged"
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    tx_digest TEXT NOT NULL,
+    event_seq TEXT NOT NULL,
+    timestamp_ms INTEGER,
+    sender TEXT,
+    nft_id TEXT,
+    owner TEXT,
+    from_address TEXT,
+    expiry_date INTEGER,
+    serial_number TEXT,
+    parsed_json TEXT,
+    UNIQUE (tx_digest, event_seq)
+);
+CREATE INDEX IF NOT EXISTS idx_events_kind_time ON events (kind, timestamp_ms);
+CREATE INDEX IF NOT EXISTS idx_events_nft ON events (nft_id);
+CREATE INDEX IF NOT EXISTS idx_events_kind_sender ON events (kind, sender);
+CREATE INDEX IF NOT EXISTS idx_events_serial ON events (serial_number);
+CREATE TABLE IF NOT EXISTS cursors (
+    kind TEXT PRIMARY KEY,
+    tx_digest TEXT NOT NULL,
+    event_seq TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS notifications_sent (
+    nft_id TEXT PRIMARY KEY,
+    expiry_date INTEGER,
+    sent_at INTEGER
+);
+"""
+
+SUI_ADDRESS_PATTERN = re.compile(r"^0x[0-9a-fA-F]{1,64}$")
+
+EVENT_COLUMNS = (
+    "id", "kind", "tx_digest", "event_seq", "timestamp_ms", "sender",
+    "nft_id", "owner", "from_address", "expiry_date", "serial_number"
+)
+
+
+def _field(obj: Any, *names: str) -> Any:
+    """Read the first present field from a JSON-RPC dict or a pysui object"""
+    for name in names:
+        if isinstance(obj, dict):
+            if obj.get(name) is not None:
+                return obj[name]
+        elif getattr(obj, name, None) is not None:
+            return getattr(obj, name)
+    return None
+
+
+def normalize_address(address: Any) -> Optional[str]:
+    """Return the canonical 0x + 64 hex form of a Sui address, or None if invalid"""
+    if not isinstance(address, str) or not SUI_ADDRESS_PATTERN.match(address):
+        return None
+    return "0x" + address[2:].lower().zfill(64)
+
+
+def _address(value: Any) -> Optional[str]:
+    """Canonical address when valid, otherwise the raw value"""
+    return normalize_address(value) or value
+
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _cursor_parts(cursor: Any) -> Optional[Tuple[str, str]]:
+    """Split an EventID cursor into (tx_digest, event_seq)"""
+    if cursor is None:
+        return None
+    tx_digest = _field(cursor, "txDigest", "tx_digest")
+    event_seq = _field(cursor, "eventSeq", "event_seq")
+    if tx_digest is None or event_seq is None:
+        return None
+    return str(tx_digest), str(event_seq)
+
+
+def normalize_event(kind: str, event: Any) -> Optional[Dict]:
+    """Flatten a Sui event into the columns stored in the index"""
+    event_id = _cursor_parts(_field(event, "id", "event_id"))
+    if event_id is None:
+        return None
+    parsed = _field(event, "parsedJson", "parsed_json") or {}
+    if not isinstance(parsed, dict):
+        parsed = {}
+
+    if kind == "transfers":
+        owner = parsed.get("to")
+    else:
+        owner = parsed.get("owner")
+
+    return {
+        "kind": kind,
+        "tx_digest": event_id[0],
+        "event_seq": event_id[1],
+        "timestamp_ms": _to_int(_field(event, "timestampMs", "timestamp_ms")),
+        "sender": _address(_field(event, "sender")),
+        "nft_id": parsed.get("nft_id"),
+        "owner": _address(owner),
+        "from_address": _address(parsed.get("from")),
+        "expiry_date": _to_int(parsed.get("expiry_date")),
+        "serial_number": parsed.get("serial_number"),
+        "parsed_json": json.dumps(parsed)
+    }
+
+
+def page_parts(page: Any) -> Tuple[List, Any, bool]:
+    """Extract (data, next_cursor, has_next_page) from a query_events result"""
+    if hasattr(page, "result_data"):
+        page = page.result_data
+    data = _field(page, "data") or []
+    next_cursor = _field(page, "nextCursor", "next_cursor")
+    has_next_page = bool(_field(page, "hasNextPage", "has_next_page"))
+    return list(data), next_cursor, has_next_page
+
+
+class EventStore:
+    """SQLite-backed event index with one saved cursor per event type"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or Config.EVENT_STORE_PATH
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+
+    def get_cursor(self, kind: str) -> Optional[Dict]:
+        """Return the last ingested EventID for an event type"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT tx_digest, event_seq FROM cursors WHERE kind = ?", (kind,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"txDigest": row["tx_digest"], "eventSeq": row["event_seq"]}
+
+    def store_page(self, kind: str, events: List, next_cursor: Any = None) -> int:
+        """Insert one page of events and advance the cursor atomically"""
+        rows = [r for r in (normalize_event(kind, e) for e in events) if r is not None]
+        cursor = _cursor_parts(next_cursor)
+        if cursor is None and rows:
+            cursor = (rows[-1]["tx_digest"], rows[-1]["event_seq"])
+
+        with self._lock:
+            before = self._conn.total_changes
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO events (kind, tx_digest, event_seq, timestamp_ms, "
+                    "sender, nft_id, owner, from_address, expiry_date, serial_number, parsed_json) "
+                    "VALUES (:kind, :tx_digest, :event_seq, :timestamp_ms, :sender, :nft_id, "
+                    ":owner, :from_address, :expiry_date, :serial_number, :parsed_json)",
+                    rows
+                )
+                inserted = self._conn.total_changes - before
+                if cursor is not None:
+                    self._conn.execute(
+                        "INSERT INTO cursors (kind, tx_digest, event_seq) VALUES (?, ?, ?) "
+                        "ON CONFLICT(kind) DO UPDATE SET tx_digest = excluded.tx_digest, "
+                        "event_seq = excluded.event_seq",
+                        (kind, cursor[0], cursor[1])
+                    )
+        return inserted
+
+    def _rows(self, sql: str, params: Tuple = ()) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_rows_since(self, last_id: int) -> List[Tuple]:
+        """Compact columnar-source rows added after last_id"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, kind, timestamp_ms, sender, nft_id, owner, expiry_date "
+                "FROM events WHERE id > ? ORDER BY id",
+                (last_id,)
+            ).fetchall()
+
+    def get_events_since(self, last_id: int, limit: int = 1000) -> List[Dict]:
+        """Events added after last_id in ingestion order, with their parsed fields"""
+        columns = ", ".join(EVENT_COLUMNS)
+        rows = self._rows(
+            f"SELECT {columns}, parsed_json FROM events WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, limit)
+        )
+        for row in rows:
+            row["parsed_json"] = json.loads(row["parsed_json"] or "{}")
+        return rows
+
+    @staticmethod
+    def _event_filter(kinds: Optional[List[str]], since_ms: Optional[int],
+                      until_ms: Optional[int]) -> Tuple[str, Tuple]:
+        """SQL conditions and parameters for the export filters"""
+        conditions, params = [], []
+        if kinds:
+            conditions.append(f"kind IN ({', '.join('?' * len(kinds))})")
+            params.extend(kinds)
+        if since_ms is not None:
+            conditions.append("timestamp_ms >= ?")
+            params.append(since_ms)
+        if until_ms is not None:
+            conditions.append("timestamp_ms < ?")
+            params.append(until_ms)
+        return "".join(f" AND {c}" for c in conditions), tuple(params)
+
+    def page_bounds(self, after_id: int, limit: int, kinds: Optional[List[str]] = None,
+                    since_ms: Optional[int] = None, until_ms: Optional[int] = None) -> Tuple[int, bool]:
+        """Id of the last matching event in the page after after_id, and whether more follow"""
+        where, params = self._event_filter(kinds, since_ms, until_ms)
+        rows = self._rows(
+            f"SELECT id FROM events WHERE id > ?{where} ORDER BY id LIMIT 1 OFFSET ?",
+            (after_id,) + params + (limit - 1,)
+        )
+        if not rows:
+            # Short page: bound it by the newest id so concurrent inserts wait for the next request
+            return self.max_id(), False
+        last_id = rows[0]["id"]
+        more = self._rows(
+            f"SELECT 1 AS n FROM events WHERE id > ?{where} LIMIT 1", (last_id,) + params
+        )
+        return last_id, bool(more)
+
+    def iter_events(self, after_id: int = 0, until_id: Optional[int] = None,
+                    kinds: Optional[List[str]] = None, since_ms: Optional[int] = None,
+                    until_ms: Optional[int] = None, chunk_size: int = 500) -> Iterator[Dict]:
+        """Matching events in id order, read in keyset chunks so memory stays flat"""
+        where, params = self._event_filter(kinds, since_ms, until_ms)
+        if until_id is not None:
+            where += " AND id <= ?"
+            params += (until_id,)
+        columns = ", ".join(EVENT_COLUMNS)
+        while True:
+            rows = self._rows(
+                f"SELECT {columns}, parsed_json FROM events WHERE id > ?{where} ORDER BY id LIMIT ?",
+                (after_id,) + params + (chunk_size,)
+            )
+            for row in rows:
+                row["parsed_json"] = json.loads(row["parsed_json"] or "{}")
+                yield row
+            if len(rows) < chunk_size:
+                return
+            after_id = rows[-1]["id"]
+
+    def max_id(self) -> int:
+        """Id of the most recently stored event, 0 when empty"""
+        return self._rows("SELECT COALESCE(MAX(id), 0) AS n FROM events")[0]["n"]
+
+    def count(self, kind: Optional[str] = None) -> int:
+        """Number of stored events, optionally for one type"""
+        if kind is None:
+            rows = self._rows("SELECT COUNT(*) AS n FROM events")
+        else:
+            rows = self._rows("SELECT COUNT(*) AS n FROM events WHERE kind = ?", (kind,))
+        return rows[0]["n"]
+
+    def _select_in(self, sql: str, column_values: List[str], params: Tuple = ()) -> List[Dict]:
+        """Run sql with an IN (...) placeholder list, chunked under SQLite's parameter limit"""
+        rows = []
+        for start in range(0, len(column_values), 500):
+            chunk = column_values[start:start + 500]
+            placeholders = ", ".join("?" * len(chunk))
+            rows.extend(self._rows(sql.format(placeholders=placeholders), params + tuple(chunk)))
+        return rows
+
+    def get_mints(self, nft_ids: List[str]) -> Dict[str, Dict]:
+        """Mint event per NFT id, with its parsed fields"""
+        rows = self._select_in(
+            "SELECT nft_id, sender, timestamp_ms, expiry_date, serial_number, parsed_json "
+            "FROM events INDEXED BY idx_events_nft WHERE kind = ? AND nft_id IN ({placeholders})",
+            nft_ids, ("mints",)
+        )
+        mints = {}
+        for row in rows:
+            row["parsed_json"] = json.loads(row["parsed_json"] or "{}")
+            mints[row["nft_id"]] = row
+        return mints
+
+    def nft_ids_for_serials(self, serials: List[str]) -> Dict[str, str]:
+        """Most recently minted NFT id per serial number"""
+        rows = self._select_in(
+            "SELECT serial_number, nft_id FROM events INDEXED BY idx_events_serial WHERE kind = ? "
+            "AND serial_number IN ({placeholders}) ORDER BY id",
+            serials, ("mints",)
+        )
+        return {row["serial_number"]: row["nft_id"] for row in rows}
+
+    def filter_unnotified(self, nft_ids: List[str]) -> List[str]:
+        """The subset of nft_ids that have not had an expiry notification yet"""
+        rows = self._select_in(
+            "SELECT nft_id FROM notifications_sent WHERE nft_id IN ({placeholders})", nft_ids
+        )
+        sent = {row["nft_id"] for row in rows}
+        return [nft_id for nft_id in nft_ids if nft_id not in sent]
+
+    def mark_notified(self, rows: List[Tuple[str, int, int]]):
+        """Record (nft_id, expiry_date, sent_at) for delivered notifications"""
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO notifications_sent (nft_id, expiry_date, sent_at) "
+                    "VALUES (?, ?, ?)",
+                    rows
+                )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
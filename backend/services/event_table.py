@@ -0,0 +1,263 @@
+# event_table.py
+"""Columnar in-memory view of the warranty event index.
+This module mirrors the SQLite event store into typed NumPy arrays with
+interned NFT ids and addresses, so per-NFT state is computed with vectorized
+reductions, and feeds the incremental rollups that answer aggregate metrics
+and daily trends.
+"""
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from services.rollups import UNDATED, Rollups
+
+# Integer codes for the event kind column
+KIND_CODES = {"mints": 0, "transfers": 1, "repairs": 2}
+NO_ADDRESS = -1
+
+# name -> dtype of every column held by the table
+COLUMNS = {
+    "timestamp_ms": np.int64,
+    "kind": np.int8,
+    "nft": np.int32,
+    "sender": np.int32,
+    "owner": np.int32,
+    "seller": np.int32,
+    "expiry_ms": np.int64
+}
+
+
+class EventTable:
+    """Append-only columnar table of warranty events.
+
+    `sender` is the transaction sender, `owner` the recipient of a mint or
+    transfer and `seller` the address that minted the event's NFT.
+    """
+
+    def __init__(self, initial_capacity: int = 1024):
+        self.size = 0
+        self.last_id = 0
+        for name, dtype in COLUMNS.items():
+            setattr(self, name, np.zeros(initial_capacity, dtype=dtype))
+        self.addresses: List[str] = []
+        self.address_index: Dict[str, int] = {}
+        self.nft_ids: List[str] = []
+        self.nft_index: Dict[str, int] = {}
+        self.nft_seller: List[int] = []
+        # Repairs/transfers ingested before their mint (parallel backfill)
+        self.unresolved = 0
+        # Global, per-seller and per-day counters updated on every append
+        self.rollups = Rollups()
+        # Current owner per interned NFT and the timestamp of the row that set it
+        self._owners = np.zeros(0, dtype=np.int32)
+        self._owned_at = np.zeros(0, dtype=np.int64)
+        # Repair count per interned NFT -> (rows covered, array)
+        self._repairs: Tuple[int, np.ndarray] = (0, np.zeros(0, dtype=np.int64))
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def _intern_address(self, address: Optional[str]) -> int:
+        if not address:
+            return NO_ADDRESS
+        idx = self.address_index.get(address)
+        if idx is None:
+            idx = len(self.addresses)
+            self.addresses.append(address)
+            self.address_index[address] = idx
+        return idx
+
+    def _intern_nft(self, nft_id: Optional[str]) -> int:
+        if not nft_id:
+            return NO_ADDRESS
+        idx = self.nft_index.get(nft_id)
+        if idx is None:
+            idx = len(self.nft_ids)
+            self.nft_ids.append(nft_id)
+            self.nft_index[nft_id] = idx
+            self.nft_seller.append(NO_ADDRESS)
+        return idx
+
+    def _reserve(self, extra: int):
+        needed = self.size + extra
+        capacity = len(self.timestamp_ms)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        # Copy into new buffers so readers holding the old views stay valid
+        for name in COLUMNS:
+            old = getattr(self, name)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[:self.size] = old[:self.size]
+            setattr(self, name, grown)
+
+    def append_rows(self, rows: List[Tuple]):
+        """Append (id, kind, timestamp_ms, sender, nft_id, owner, expiry_date) rows in id order"""
+        if not rows:
+            return
+        count = len(rows)
+        batch = {name: np.empty(count, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+        with self._lock:
+            self._reserve(count)
+            for i, (row_id, kind, timestamp_ms, sender, nft_id, owner, expiry_date) in enumerate(rows):
+                code = KIND_CODES[kind]
+                nft = self._intern_nft(nft_id)
+                sender_idx = self._intern_address(sender)
+                if code == 0 and nft != NO_ADDRESS:
+                    self.nft_seller[nft] = sender_idx
+                batch["timestamp_ms"][i] = timestamp_ms or 0
+                batch["kind"][i] = code
+                batch["nft"][i] = nft
+                batch["sender"][i] = sender_idx
+                batch["owner"][i] = self._intern_address(owner)
+                # Repairs and transfers belong to the seller who minted the NFT
+                batch["seller"][i] = self.nft_seller[nft] if nft != NO_ADDRESS else NO_ADDRESS
+                batch["expiry_ms"][i] = expiry_date or 0
+
+            start, end = self.size, self.size + count
+            for name in COLUMNS:
+                getattr(self, name)[start:end] = batch[name]
+            self.size = end
+            self.last_id = rows[-1][0]
+            self.rollups.apply(batch["timestamp_ms"], batch["kind"], batch["seller"], batch["expiry_ms"])
+            self._update_owners(batch)
+
+            orphans = (batch["seller"] == NO_ADDRESS) & (batch["nft"] != NO_ADDRESS)
+            self.unresolved += int(orphans.sum())
+            if self.unresolved and (batch["kind"] == KIND_CODES["mints"]).any():
+                self._resolve_sellers()
+
+    def _update_owners(self, batch: Dict[str, np.ndarray]):
+        """Fold a batch's mints and transfers into the current owners.
+
+        The arrays are replaced rather than written in place, so callers of
+        current_owners() keep a consistent snapshot.
+        """
+        kinds, nfts, timestamps = batch["kind"], batch["nft"], batch["timestamp_ms"]
+        rows = np.nonzero((kinds <= KIND_CODES["transfers"]) & (nfts != NO_ADDRESS))[0]
+        if not len(rows) and len(self._owners) == len(self.nft_ids):
+            return
+        owners = np.full(len(self.nft_ids), NO_ADDRESS, dtype=np.int32)
+        owners[:len(self._owners)] = self._owners
+        owned_at = np.full(len(self.nft_ids), np.iinfo(np.int64).min, dtype=np.int64)
+        owned_at[:len(self._owned_at)] = self._owned_at
+        if len(rows):
+            # Latest row per NFT by time, then by ingestion order
+            order = rows[np.lexsort((rows, timestamps[rows]))][::-1]
+            touched, first = np.unique(nfts[order], return_index=True)
+            latest = order[first]
+            # Rows arrive in id order, so a tie with an earlier batch goes to this one
+            newer = timestamps[latest] >= owned_at[touched]
+            owners[touched[newer]] = batch["owner"][latest[newer]]
+            owned_at[touched[newer]] = timestamps[latest[newer]]
+        self._owners, self._owned_at = owners, owned_at
+
+    def _resolve_sellers(self):
+        """Attribute rows that arrived before their mint to the minting seller"""
+        nfts = self.nft[:self.size]
+        sellers = self.seller[:self.size]
+        pending = np.nonzero((sellers == NO_ADDRESS) & (nfts != NO_ADDRESS))[0]
+        lookup = np.asarray(self.nft_seller, dtype=np.int32)
+        sellers[pending] = lookup[nfts[pending]]
+        resolved = pending[sellers[pending] != NO_ADDRESS]
+        self.unresolved = len(pending) - len(resolved)
+        # These rows already count globally; credit them to their seller now
+        self.rollups.apply(self.timestamp_ms[resolved], self.kind[resolved], sellers[resolved],
+                           self.expiry_ms[resolved], count_global=False)
+
+    def refresh(self, store):
+        """Pull rows added to the event store since the last refresh"""
+        with self._refresh_lock:
+            self.append_rows(store.get_rows_since(self.last_id))
+
+    def columns(self, *names: str) -> Tuple[np.ndarray, ...]:
+        """Consistent views of the filled part of the named columns"""
+        with self._lock:
+            n = self.size
+            return tuple(getattr(self, name)[:n] for name in names)
+
+    def seller_of(self, nft_id: Optional[str]) -> Optional[str]:
+        """Address that minted an NFT, if its mint has been ingested"""
+        nft = self.nft_index.get(nft_id)
+        if nft is None or self.nft_seller[nft] == NO_ADDRESS:
+            return None
+        return self.addresses[self.nft_seller[nft]]
+
+    def _day(self, ms: int) -> int:
+        return int(self.rollups.day_numbers(np.array([ms], dtype=np.int64))[0])
+
+    def _seller(self, seller_address: Optional[str]) -> Optional[int]:
+        """Interned index of a seller, NO_ADDRESS if unknown, None for all sellers"""
+        if seller_address is None:
+            return None
+        return self.address_index.get(seller_address, NO_ADDRESS)
+
+    def kind_counts(self, since_ms: int = 0,
+                    seller_address: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-kind totals and per-kind counts from the local day of since_ms on"""
+        first_day = self._day(since_ms) if since_ms > 0 else UNDATED
+        return self.rollups.counts(first_day, self._seller(seller_address))
+
+    def average_duration_days(self, seller_address: Optional[str] = None) -> Optional[int]:
+        """Mean warranty period in days over mints that carry an expiry date"""
+        seller = self._seller(seller_address)
+        if seller == NO_ADDRESS:
+            return None
+        return self.rollups.average_duration_days(seller)
+
+    def rebuild_rollups(self) -> bool:
+        """Recompute the rollups from the columns and swap them in.
+
+        Returns whether the incrementally maintained rollups matched.
+        """
+        with self._lock:
+            n = self.size
+            rebuilt = Rollups()
+            rebuilt.apply(self.timestamp_ms[:n], self.kind[:n], self.seller[:n], self.expiry_ms[:n])
+            matched = rebuilt.same_as(self.rollups)
+            self.rollups = rebuilt
+        return matched
+
+    def current_owners(self) -> np.ndarray:
+        """Owner address index per interned NFT after the latest mint or transfer, updated on append"""
+        return self._owners
+
+    def repair_counts(self) -> np.ndarray:
+        """Number of repairs logged per interned NFT, extended incrementally"""
+        kinds, nfts = self.columns("kind", "nft")
+        covered, cached = self._repairs
+        if covered == len(kinds) and len(cached) == len(self.nft_ids):
+            return cached
+        fresh = nfts[covered:][(kinds[covered:] == KIND_CODES["repairs"]) & (nfts[covered:] != NO_ADDRESS)]
+        counts = np.zeros(len(self.nft_ids), dtype=np.int64)
+        counts[:len(cached)] = cached
+        counts += np.bincount(fresh, minlength=len(counts))[:len(counts)]
+        self._repairs = (len(kinds), counts)
+        return counts
+
+    def owner_counts(self, address: str) -> Dict[str, int]:
+        """Warranties held by an address, repairs on them and transfers it sent"""
+        idx = self.address_index.get(address)
+        if idx is None:
+            return {"owned": 0, "repairs": 0, "transfers_sent": 0}
+        owned = self.current_owners() == idx
+        kinds, nfts, senders = self.columns("kind", "nft", "sender")
+        repairs = (kinds == KIND_CODES["repairs"]) & (nfts != NO_ADDRESS)
+        repairs_on_owned = int(owned[nfts[repairs]].sum()) if len(owned) else 0
+        # transfer_warranty asserts the sender is the current owner
+        transfers_sent = int(((kinds == KIND_CODES["transfers"]) & (senders == idx)).sum())
+        return {"owned": int(owned.sum()), "repairs": repairs_on_owned, "transfers_sent": transfers_sent}
+
+    def daily_counts(self, days: int, seller_address: Optional[str] = None,
+                     end: Optional[datetime] = None) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Per-day event counts for the last `days` local days ending today.
+
+        Returns (dates, counts, before) where counts has shape (3, days) indexed
+        by KIND_CODES and before holds the per-kind totals ahead of the window.
+        """
+        end = end or datetime.now()
+        first_day = end.date().toordinal() - (days - 1)
+        dates = [date.fromordinal(first_day + i).strftime("%Y-%m-%d") for i in range(days)]
+        counts, before = self.rollups.window(first_day, days, self._seller(seller_address))
+        return dates, counts, before
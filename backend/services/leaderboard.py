@@ -0,0 +1,181 @@
+# leaderboard.py
+"""Seller leaderboard for the WarranChain backend.
+This module ranks sellers by e-waste prevented, repairs, warranties issued
+or CO2 saved over calendar windows. Each (window, metric) board is a sorted
+list over the per-seller rollups, updated only for sellers with new events,
+so top-K is a slice and the rank of one seller is a binary search.
+"""
+import threading
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config import Config
+from services.cache import MetricsCache, metrics_cache
+from services.event_ingestion import EventIngestor, event_ingestor
+from services.instrumentation import registry, timed
+from services.rollups import UNDATED, Rollups
+from services.seller_sustainability import (
+    CARBON_PER_REPAIR, CARBON_PER_WARRANTY, EWASTE_PER_REPAIR, EWASTE_PER_WARRANTY
+)
+
+# metric -> weights of [mints, transfers, repairs], matching the seller metrics
+METRICS = {
+    "ewaste": (EWASTE_PER_WARRANTY, 0, EWASTE_PER_REPAIR),
+    "repairs": (0, 0, 1),
+    "warranties": (1, 0, 0),
+    "carbon": (CARBON_PER_WARRANTY, 0, CARBON_PER_REPAIR)
+}
+WINDOWS = ("all", "month", "week")
+
+
+def window_start(window: str, now: Optional[datetime] = None) -> int:
+    """First local day of the current calendar window, UNDATED for all time"""
+    today = (now or datetime.now()).date()
+    if window == "month":
+        return today.replace(day=1).toordinal()
+    if window == "week":
+        return (today - timedelta(days=today.weekday())).toordinal()
+    return UNDATED
+
+
+class Leaderboard:
+    """Sorted (-score, seller) boards per window and metric.
+
+    Sellers with a zero score in a window are left off its board.
+    """
+
+    def __init__(self, ingestor: Optional[EventIngestor] = None, cache: Optional[MetricsCache] = None):
+        self.ingestor = ingestor or event_ingestor
+        self.cache = cache or metrics_cache
+        self._boards: Dict[Tuple[str, str], List[Tuple[float, int]]] = {}
+        # (window, metric) -> seller -> score currently on the board
+        self._scores: Dict[Tuple[str, str], Dict[int, float]] = {}
+        self._starts: Dict[str, int] = {}
+        self._addresses: List[str] = []
+        self._address_index: Dict[str, int] = {}
+        self._rollups: Optional[Rollups] = None
+        self._lock = threading.Lock()
+        self.stats = {"refreshes": 0, "sellers_rescored": 0, "window_rollovers": 0}
+
+    def _reset(self, rollups: Rollups):
+        self._boards = {(w, m): [] for w in WINDOWS for m in METRICS}
+        self._scores = {(w, m): {} for w in WINDOWS for m in METRICS}
+        self._starts = {}
+        self._rollups = rollups
+
+    def _rescore(self, rollups: Rollups, window: str, first_day: int, sellers: List[int]):
+        """Move the given sellers to their current score on every board of the window"""
+        if not sellers:
+            return
+        counts = rollups.counts_many(first_day, sellers)
+        fresh = {}
+        for metric, weights in METRICS.items():
+            weights = np.asarray(weights)
+            # Integer metrics stay integers; CO2 is rounded like the seller metrics
+            scores = counts @ weights if weights.dtype.kind == "i" else np.round(counts @ weights, 2)
+            fresh[metric] = dict(zip(sellers, scores.tolist()))
+
+        for metric, updates in fresh.items():
+            board, scores = self._boards[(window, metric)], self._scores[(window, metric)]
+            if len(updates) > max(64, len(scores) // 8):
+                # Bulk change (first pass, rollover, backfill): re-sort once
+                scores.update(updates)
+                for seller in [s for s, score in updates.items() if score <= 0]:
+                    del scores[seller]
+                board[:] = sorted((-score, seller) for seller, score in scores.items())
+                continue
+            for seller, score in updates.items():
+                old = scores.get(seller)
+                if old == score:
+                    continue
+                if old is not None:
+                    del board[bisect_left(board, (-old, seller))]
+                if score > 0:
+                    insort(board, (-score, seller))
+                    scores[seller] = score
+                else:
+                    scores.pop(seller, None)
+
+    def refresh(self):
+        """Rescore sellers with new events, and every seller when a window rolls over"""
+        table = self.ingestor.get_table()
+        with self._lock:
+            rollups = table.rollups
+            if rollups is not self._rollups:
+                self._reset(rollups)
+            changed = rollups.take_dirty("leaderboard")
+            self._addresses, self._address_index = table.addresses, table.address_index
+            for window in WINDOWS:
+                first_day = window_start(window)
+                if self._starts.get(window, first_day) != first_day:
+                    # New month or week: drop last window's scores and rank from scratch
+                    ranked = set(self._scores[(window, "ewaste")])
+                    for metric in METRICS:
+                        self._boards[(window, metric)] = []
+                        self._scores[(window, metric)] = {}
+                    self._rescore(rollups, window, first_day, sorted(ranked.union(changed)))
+                    self.stats["window_rollovers"] += 1
+                else:
+                    self._rescore(rollups, window, first_day, changed)
+                self._starts[window] = first_day
+            self.stats["refreshes"] += 1
+            self.stats["sellers_rescored"] += len(changed)
+
+    def _top(self, metric: str, window: str) -> Dict:
+        self.refresh()
+        with self._lock:
+            board = self._boards[(window, metric)]
+            head = board[:Config.LEADERBOARD_MAX_LIMIT]
+            ranked = len(board)
+            addresses = self._addresses
+        entries = []
+        for i, (negative, seller) in enumerate(head):
+            # Competition ranking: ties share the rank of the first of them
+            rank = entries[-1]["rank"] if entries and entries[-1]["score"] == -negative else i + 1
+            entries.append({"rank": rank, "seller": addresses[seller], "score": -negative})
+        return {
+            "metric": metric,
+            "window": window,
+            "sellers_ranked": ranked,
+            "entries": entries,
+            "last_updated": datetime.now().isoformat()
+        }
+
+    @timed("leaderboard_top")
+    def top(self, metric: str = "ewaste", window: str = "all", limit: Optional[int] = None) -> Dict:
+        """Top sellers of a board; the longest list is cached and sliced per request"""
+        limit = min(limit or Config.LEADERBOARD_DEFAULT_LIMIT, Config.LEADERBOARD_MAX_LIMIT)
+        result = dict(self.cache.get(f"leaderboard_{window}_{metric}", lambda: self._top(metric, window)))
+        result["entries"] = result["entries"][:limit]
+        return result
+
+    @timed("leaderboard_rank")
+    def rank(self, seller_address: str, metric: str = "ewaste", window: str = "all") -> Dict:
+        """A seller's rank and score on one board; rank is None with a zero score"""
+        self.refresh()
+        with self._lock:
+            seller = self._address_index.get(seller_address)
+            board = self._boards[(window, metric)]
+            score = self._scores[(window, metric)].get(seller) if seller is not None else None
+            rank = bisect_left(board, (-score,)) + 1 if score is not None else None
+            ranked = len(board)
+        return {
+            "seller": seller_address,
+            "metric": metric,
+            "window": window,
+            "rank": rank,
+            "score": score or 0,
+            "sellers_ranked": ranked
+        }
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["sellers_ranked"] = len(self._scores.get(("all", "ewaste"), {}))
+        return stats
+
+
+# Global leaderboard
+leaderboard = Leaderboard()
+registry.register_collector("warranchain_leaderboard", leaderboard.get_stats)
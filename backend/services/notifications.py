@@ -0,0 +1,307 @@
+# notifications.py
+"""Warranty expiry notifications for the WarranChain backend.
+This module keeps every minted warranty in a heap ordered by the time its
+expiry reminder is due, fed incrementally from the columnar event table.
+Each scheduler tick pops only the warranties that are due, resolves their
+current owner from transfer history and dispatches reminders in
+rate-limited batches through a pluggable sender.
+"""
+import heapq
+import logging
+from abc import ABC, abstractmethod
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from config import Config
+from services.cache import metrics_cache
+from services.event_ingestion import EventIngestor, event_ingestor
+from services.event_table import KIND_CODES, NO_ADDRESS, EventTable
+from services.instrumentation import registry
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = 86_400_000
+
+# (notify_at_ms, expiry_ms, interned nft index)
+ExpiryEntry = Tuple[int, int, int]
+
+
+class NotificationSender(ABC):
+    """Delivers one batch of notifications and reports which were accepted"""
+
+    @abstractmethod
+    def send_batch(self, notifications: List[Dict]) -> List[bool]:
+        """Whether each notification was accepted, in batch order"""
+        ...
+
+
+class FakeSender(NotificationSender):
+    """Records notifications in memory; used locally and in tests"""
+
+    def __init__(self):
+        self.sent: List[Dict] = []
+        self.batches = 0
+
+    def send_batch(self, notifications: List[Dict]) -> List[bool]:
+        self.sent.extend(notifications)
+        self.batches += 1
+        logger.info(f"Fake sender accepted {len(notifications)} expiry notifications")
+        return [True] * len(notifications)
+
+
+class FirebaseSender(NotificationSender):
+    """Firebase Cloud Messaging, one topic per owner address"""
+
+    def __init__(self, cred_path: Optional[str] = None):
+        import firebase_admin
+        from firebase_admin import credentials, messaging
+        try:
+            firebase_admin.get_app()
+        except ValueError:
+            # No default app yet
+            firebase_admin.initialize_app(credentials.Certificate(cred_path or Config.FIREBASE_CRED_PATH))
+        self.messaging = messaging
+
+    @staticmethod
+    def owner_topic(owner: str) -> str:
+        return f"warranty-owner-{owner[2:]}"
+
+    def send_batch(self, notifications: List[Dict]) -> List[bool]:
+        messages = [
+            self.messaging.Message(
+                topic=self.owner_topic(n["owner"]),
+                notification=self.messaging.Notification(
+                    title="Warranty expiring soon",
+                    body=f"Your warranty expires in {n['days_left']} day(s)."
+                ),
+                data={key: str(value) for key, value in n.items()}
+            )
+            for n in notifications
+        ]
+        # send_each accepts at most 500 messages per call
+        response = self.messaging.send_each(messages)
+        return [r.success for r in response.responses]
+
+
+def create_sender(kind: Optional[str] = None) -> NotificationSender:
+    """Sender selected by Config.NOTIFY_SENDER: firebase or fake"""
+    kind = (kind or Config.NOTIFY_SENDER).lower()
+    if kind == "firebase":
+        try:
+            return FirebaseSender()
+        except Exception as e:
+            logger.warning(f"Could not initialize Firebase sender, using fake sender: {e}")
+    return FakeSender()
+
+
+class ExpiryIndex:
+    """Min-heap of warranties keyed by when their expiry reminder is due"""
+
+    def __init__(self, lead_ms: int):
+        self.lead_ms = lead_ms
+        self.heap: List[ExpiryEntry] = []
+        # Table rows already scanned for mints
+        self.covered = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def feed(self, table: EventTable) -> int:
+        """Index mints appended to the table since the last feed"""
+        kinds, nfts, expiries = table.columns("kind", "nft", "expiry_ms")
+        start = self.covered
+        new = np.nonzero(
+            (kinds[start:] == KIND_CODES["mints"]) & (expiries[start:] > 0) & (nfts[start:] != NO_ADDRESS)
+        )[0] + start
+        entries = list(zip((expiries[new] - self.lead_ms).tolist(), expiries[new].tolist(), nfts[new].tolist()))
+        with self._lock:
+            self.covered = len(kinds)
+            if len(entries) > len(self.heap):
+                # Bulk load (first feed or backfill) in linear time
+                self.heap.extend(entries)
+                heapq.heapify(self.heap)
+            else:
+                for entry in entries:
+                    heapq.heappush(self.heap, entry)
+        return len(entries)
+
+    def push(self, entries: List[ExpiryEntry]):
+        with self._lock:
+            for entry in entries:
+                heapq.heappush(self.heap, entry)
+
+    def pop_due(self, now_ms: int, limit: int) -> List[ExpiryEntry]:
+        """Remove up to limit entries whose reminder is due, skipping expired ones"""
+        due = []
+        with self._lock:
+            while self.heap and self.heap[0][0] <= now_ms and len(due) < limit:
+                entry = heapq.heappop(self.heap)
+                if entry[1] > now_ms:
+                    due.append(entry)
+        return due
+
+    def next_due(self) -> Optional[int]:
+        with self._lock:
+            return self.heap[0][0] if self.heap else None
+
+
+class NotificationService:
+    """Schedules expiry reminders and dispatches them in rate-limited batches.
+
+    Only one process per host sends: the holder of the "notifier" lock on
+    the shared snapshot backend, when one is configured.
+    """
+
+    def __init__(self, ingestor: Optional[EventIngestor] = None,
+                 sender: Optional[NotificationSender] = None, backend=None):
+        self.ingestor = ingestor or event_ingestor
+        self._sender = sender
+        self._backend = backend
+        self.index = ExpiryIndex(Config.NOTIFY_LEAD_DAYS * DAY_MS)
+        self.batch_size = Config.NOTIFY_BATCH_SIZE
+        self.rate = Config.NOTIFY_RATE_PER_SEC
+        self.max_per_tick = Config.NOTIFY_MAX_PER_TICK
+        self.retry_ms = Config.NOTIFY_RETRY_DELAY * 1000
+        self.stats = {"ticks": 0, "sent": 0, "failed": 0, "skipped": 0}
+        self._next_send = 0.0
+        self._leader = None
+        self._scheduler = None
+        self._tick_lock = threading.Lock()
+
+    @property
+    def sender(self) -> NotificationSender:
+        if self._sender is None:
+            self._sender = create_sender()
+        return self._sender
+
+    @property
+    def backend(self):
+        """Snapshot backend holding the leader lock; the metrics cache's by default"""
+        return self._backend if self._backend is not None else metrics_cache.backend
+
+    def _is_leader(self) -> bool:
+        if self.backend is None:
+            return True
+        lease = Config.NOTIFY_INTERVAL * 3
+        if self._leader is not None and not self.backend.renew(self._leader, lease=lease):
+            self._leader = None
+        if self._leader is None:
+            self._leader = self.backend.acquire("notifier", lease=lease)
+        return self._leader is not None
+
+    def tick(self, now_ms: Optional[int] = None) -> int:
+        """Index new mints and send every reminder that is due; returns how many were sent"""
+        if not self._tick_lock.acquire(blocking=False):
+            return 0
+        try:
+            if not self._is_leader():
+                return 0
+            now_ms = now_ms or int(time.time() * 1000)
+            table = self.ingestor.get_table()
+            self.index.feed(table)
+            due = self.index.pop_due(now_ms, self.max_per_tick)
+            self.stats["ticks"] += 1
+            return self._dispatch(table, due, now_ms) if due else 0
+        except Exception as e:
+            logger.error(f"Error in notification tick: {str(e)}")
+            return 0
+        finally:
+            self._tick_lock.release()
+
+    def _throttle(self, count: int):
+        """Token-bucket pacing so dispatch never exceeds NOTIFY_RATE_PER_SEC"""
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        self._next_send = max(self._next_send, now)
+        if self._next_send > now:
+            time.sleep(self._next_send - now)
+        self._next_send += count / self.rate
+
+    def _build(self, table: EventTable, owners: np.ndarray,
+               batch: List[ExpiryEntry], now_ms: int) -> List[Dict]:
+        """Notification payloads for a batch, skipping ones already sent or without an owner"""
+        nft_ids = [table.nft_ids[nft] for _, _, nft in batch]
+        pending = set(self.ingestor.store.filter_unnotified(nft_ids))
+        notifications = []
+        for (_, expiry_ms, nft), nft_id in zip(batch, nft_ids):
+            owner = owners[nft] if nft < len(owners) else NO_ADDRESS
+            if nft_id not in pending or owner == NO_ADDRESS:
+                self.stats["skipped"] += 1
+                continue
+            notifications.append({
+                "nft_id": nft_id,
+                "owner": table.addresses[owner],
+                "expiry_date": expiry_ms,
+                "days_left": max(0, -(-(expiry_ms - now_ms) // DAY_MS)),
+                "expires_at": datetime.fromtimestamp(expiry_ms / 1000).isoformat()
+            })
+        return notifications
+
+    def _dispatch(self, table: EventTable, due: List[ExpiryEntry], now_ms: int) -> int:
+        # Owners after the latest transfer, computed once for the whole tick
+        owners = table.current_owners()
+        sent = 0
+        for start in range(0, len(due), self.batch_size):
+            batch = due[start:start + self.batch_size]
+            notifications = self._build(table, owners, batch, now_ms)
+            if not notifications:
+                continue
+            self._throttle(len(notifications))
+            try:
+                results = self.sender.send_batch(notifications)
+            except Exception as e:
+                logger.error(f"Error sending expiry notifications: {str(e)}")
+                results = [False] * len(notifications)
+            accepted = [n for n, ok in zip(notifications, results) if ok]
+            if accepted:
+                self.ingestor.store.mark_notified(
+                    [(n["nft_id"], n["expiry_date"], now_ms) for n in accepted]
+                )
+            # Try the rejected and unsent reminders again on a later tick
+            unsent = {n["nft_id"] for n in notifications} - {n["nft_id"] for n in accepted}
+            if unsent:
+                self.index.push([(now_ms + self.retry_ms, expiry, nft) for _, expiry, nft in batch
+                                 if table.nft_ids[nft] in unsent])
+            self.stats["failed"] += len(unsent)
+            self.stats["sent"] += len(accepted)
+            sent += len(accepted)
+        return sent
+
+    def start(self):
+        """Run tick() on an APScheduler interval job"""
+        if self._scheduler is not None:
+            return
+        from apscheduler.schedulers.background import BackgroundScheduler
+        self._scheduler = BackgroundScheduler(daemon=True)
+        self._scheduler.add_job(
+            self.tick, "interval", seconds=Config.NOTIFY_INTERVAL,
+            max_instances=1, coalesce=True, next_run_time=datetime.now()
+        )
+        self._scheduler.start()
+        logger.info("Expiry notification scheduler started")
+
+    def stop(self):
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+        if self._leader is not None:
+            self.backend.release(self._leader)
+            self._leader = None
+
+    def get_stats(self) -> Dict:
+        next_due = self.index.next_due()
+        return {
+            **self.stats,
+            "indexed": len(self.index),
+            "next_due": datetime.fromtimestamp(next_due / 1000).isoformat() if next_due else None,
+            "is_sender": self._leader is not None or self.backend is None
+        }
+
+
+# Global notification service
+notification_service = NotificationService()
+registry.register_collector("warranchain_notifications", notification_service.get_stats)
@@ -0,0 +1,285 @@
+# rollups.py
+"""Incrementally maintained rollups of the warranty event index.
+This module keeps global totals, per-seller totals and per-day counters
+(globally and per seller) up to date as events are appended to the event
+table, so dashboard metrics and trends are lookups whose cost does not grow
+with chain history. A rollup can also be rebuilt from the table's columns
+to verify the incremental state.
+"""
+import threading
+from datetime import date, datetime
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+
+# Day number of events without a timestamp; real days are date ordinals
+UNDATED = 0
+# Extra days of local-midnight edges built ahead of the newest event
+EDGE_SLACK_DAYS = 31
+# Earliest timestamps kept per seller and kind, enough to date count thresholds
+EARLIEST_KEPT = 32
+
+
+class Rollups:
+    """Per-kind event counters indexed by interned seller and local day.
+
+    Counts are [mints, transfers, repairs] in KIND_CODES order. Rows without
+    a seller (not yet attributed to a mint) only count globally until
+    `apply(..., count_global=False)` attributes them.
+    """
+
+    def __init__(self):
+        self.totals = np.zeros(3, dtype=np.int64)
+        # day -> [mints, transfers, repairs]
+        self.daily: Dict[int, List[int]] = {}
+        self.seller_totals = np.zeros((0, 3), dtype=np.int64)
+        # seller -> day -> [mints, transfers, repairs]
+        self.seller_daily: Dict[int, Dict[int, List[int]]] = {}
+        # Sum and count of warranty periods (ms) over mints with an expiry
+        self.duration_sum = np.zeros(0, dtype=np.int64)
+        self.duration_count = np.zeros(0, dtype=np.int64)
+        self.global_duration = [0, 0]
+        # seller -> per-kind sorted earliest EARLIEST_KEPT dated timestamps
+        self.earliest: Dict[int, List[List[int]]] = {}
+        # consumer -> sellers whose counters changed since its last take_dirty()
+        self._dirty: Dict[str, Set[int]] = {}
+        self.max_day = UNDATED
+        # Local-midnight timestamps of consecutive days starting at _edges_start
+        self._edges_start = UNDATED
+        self._edges = np.zeros(0, dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def _cover(self, lo_ms: int, hi_ms: int):
+        """Extend the day edges so every timestamp in [lo_ms, hi_ms] falls inside them"""
+        first = date.fromtimestamp(lo_ms / 1000).toordinal()
+        last = date.fromtimestamp(hi_ms / 1000).toordinal()
+        end = self._edges_start + len(self._edges) - 1
+        if self._edges_start != UNDATED and first >= self._edges_start and last < end:
+            return
+        start = first if self._edges_start == UNDATED else min(first, self._edges_start)
+        end = max(last + EDGE_SLACK_DAYS, end)
+        self._edges = np.array(
+            [int(datetime.fromordinal(day).timestamp() * 1000) for day in range(start, end + 1)],
+            dtype=np.int64
+        )
+        self._edges_start = start
+
+    def day_numbers(self, timestamps: np.ndarray) -> np.ndarray:
+        """Local day number of each timestamp, UNDATED for missing ones"""
+        days = np.full(len(timestamps), UNDATED, dtype=np.int64)
+        dated = timestamps > 0
+        if dated.any():
+            stamps = timestamps[dated]
+            with self._lock:
+                self._cover(int(stamps.min()), int(stamps.max()))
+                days[dated] = self._edges_start + np.searchsorted(self._edges, stamps, side="right") - 1
+        return days
+
+    def _reserve(self, sellers: int):
+        if sellers <= len(self.seller_totals):
+            return
+        capacity = max(sellers, 2 * len(self.seller_totals), 64)
+        grown = np.zeros((capacity, 3), dtype=np.int64)
+        grown[:len(self.seller_totals)] = self.seller_totals
+        self.seller_totals = grown
+        for name in ("duration_sum", "duration_count"):
+            old = getattr(self, name)
+            column = np.zeros(capacity, dtype=np.int64)
+            column[:len(old)] = old
+            setattr(self, name, column)
+
+    @staticmethod
+    def _group(keys: np.ndarray, kinds: np.ndarray) -> Tuple[List[int], List[List[int]]]:
+        """Distinct keys and their per-kind counts"""
+        unique, inverse = np.unique(keys, return_inverse=True)
+        counts = np.bincount(inverse.ravel() * 3 + kinds, minlength=3 * len(unique)).reshape(-1, 3)
+        return unique.tolist(), counts.tolist()
+
+    @staticmethod
+    def _add(target: Dict[int, List[int]], key: int, counts: List[int]):
+        bucket = target.get(key)
+        if bucket is None:
+            target[key] = counts
+        else:
+            bucket[0] += counts[0]
+            bucket[1] += counts[1]
+            bucket[2] += counts[2]
+
+    def apply(self, timestamps: np.ndarray, kinds: np.ndarray, sellers: np.ndarray,
+              expiries: np.ndarray, count_global: bool = True):
+        """Fold a batch of rows into the rollups in time linear in the batch"""
+        if not len(kinds):
+            return
+        days = self.day_numbers(timestamps)
+        kinds = kinds.astype(np.int64)
+        with self._lock:
+            if count_global:
+                self.totals += np.bincount(kinds, minlength=3)[:3]
+                for day, counts in zip(*self._group(days, kinds)):
+                    self._add(self.daily, day, counts)
+                mints = (kinds == 0) & (expiries > timestamps) & (timestamps > 0)
+                self.global_duration[0] += int((expiries[mints] - timestamps[mints]).sum())
+                self.global_duration[1] += int(mints.sum())
+            self.max_day = max(self.max_day, int(days.max()))
+
+            # Sellers are interned address indexes; negative means unattributed
+            attributed = sellers >= 0
+            if not attributed.any():
+                return
+            s = sellers[attributed].astype(np.int64)
+            d, k = days[attributed], kinds[attributed]
+            self._reserve(int(s.max()) + 1)
+            np.add.at(self.seller_totals, (s, k), 1)
+
+            # One bucket update per distinct (seller, day) in the batch
+            lo = int(d.min())
+            span = int(d.max()) - lo + 1
+            for key, counts in zip(*self._group(s * span + (d - lo), k)):
+                seller, day = divmod(key, span)
+                per_day = self.seller_daily.get(seller)
+                if per_day is None:
+                    per_day = self.seller_daily[seller] = {}
+                self._add(per_day, day + lo, counts)
+
+            stamps, ends = timestamps[attributed], expiries[attributed]
+            mints = (k == 0) & (ends > stamps) & (stamps > 0)
+            np.add.at(self.duration_sum, s[mints], ends[mints] - stamps[mints])
+            np.add.at(self.duration_count, s[mints], 1)
+            self._keep_earliest(s, k, stamps)
+            changed = np.unique(s).tolist()
+            for dirty in self._dirty.values():
+                dirty.update(changed)
+
+    def _keep_earliest(self, sellers: np.ndarray, kinds: np.ndarray, timestamps: np.ndarray):
+        """Merge each (seller, kind) group's smallest dated timestamps into the kept lists"""
+        dated = timestamps > 0
+        sellers, kinds, timestamps = sellers[dated], kinds[dated], timestamps[dated]
+        if not len(timestamps):
+            return
+        order = np.lexsort((timestamps, kinds, sellers))
+        groups = (sellers * 3 + kinds)[order]
+        stamps = timestamps[order].tolist()
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        ends = np.r_[starts[1:], len(groups)]
+        for start, end, group in zip(starts.tolist(), ends.tolist(), groups[starts].tolist()):
+            seller, kind = divmod(group, 3)
+            kept = self.earliest.get(seller)
+            if kept is None:
+                kept = self.earliest[seller] = [[], [], []]
+            fresh = stamps[start:min(end, start + EARLIEST_KEPT)]
+            if kept[kind] and fresh[0] >= kept[kind][-1]:
+                if len(kept[kind]) < EARLIEST_KEPT:
+                    kept[kind].extend(fresh[:EARLIEST_KEPT - len(kept[kind])])
+            else:
+                kept[kind] = sorted(kept[kind] + fresh)[:EARLIEST_KEPT]
+
+    def take_dirty(self, consumer: str) -> List[int]:
+        """Sellers changed since the consumer's previous call; every seller on its first call"""
+        with self._lock:
+            dirty = self._dirty.get(consumer)
+            if dirty is None:
+                dirty = set(self.seller_daily)
+            self._dirty[consumer] = set()
+        return sorted(dirty)
+
+    def seller_history(self, seller: int) -> Tuple[np.ndarray, List[Tuple[int, List[int]]], List[List[int]]]:
+        """A seller's totals, per-day counters newest first and earliest timestamps per kind"""
+        with self._lock:
+            totals, daily = self._series(seller)
+            days = sorted(((day, list(bucket)) for day, bucket in daily.items()), reverse=True)
+            earliest = [list(stamps) for stamps in self.earliest.get(seller, [[], [], []])]
+        return totals.copy(), days, earliest
+
+    def _series(self, seller: Optional[int]) -> Tuple[np.ndarray, Dict[int, List[int]]]:
+        if seller is None:
+            return self.totals, self.daily
+        if seller < 0 or seller >= len(self.seller_totals):
+            return np.zeros(3, dtype=np.int64), {}
+        return self.seller_totals[seller], self.seller_daily.get(seller, {})
+
+    @staticmethod
+    def _sum_from(daily: Dict[int, List[int]], first_day: int, last_day: int) -> np.ndarray:
+        """Counts over days >= first_day, walking whichever of the range or the dict is shorter"""
+        counts = np.zeros(3, dtype=np.int64)
+        if last_day - first_day + 1 <= len(daily):
+            days = (daily.get(day) for day in range(first_day, last_day + 1))
+            buckets = [b for b in days if b is not None]
+        else:
+            buckets = [b for day, b in daily.items() if day >= first_day]
+        if buckets:
+            counts += np.asarray(buckets, dtype=np.int64).sum(axis=0)
+        return counts
+
+    def counts(self, first_day: int = UNDATED, seller: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-kind totals and per-kind counts from first_day on"""
+        with self._lock:
+            totals, daily = self._series(seller)
+            totals = totals.copy()
+            recent = totals.copy() if first_day <= UNDATED else self._sum_from(daily, first_day, self.max_day)
+        return totals, recent
+
+    def counts_many(self, first_day: int, sellers: List[int]) -> np.ndarray:
+        """Per-kind counts from first_day on for many sellers, shape (len(sellers), 3)"""
+        out = np.zeros((len(sellers), 3), dtype=np.int64)
+        with self._lock:
+            known = np.asarray(sellers, dtype=np.int64)
+            known = (known >= 0) & (known < len(self.seller_totals))
+            if first_day <= UNDATED:
+                out[known] = self.seller_totals[np.asarray(sellers, dtype=np.int64)[known]]
+                return out
+            for i, seller in enumerate(sellers):
+                daily = self.seller_daily.get(seller)
+                if daily:
+                    out[i] = self._sum_from(daily, first_day, self.max_day)
+        return out
+
+    def window(self, first_day: int, days: int,
+               seller: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-day counts of shape (3, days) from first_day, and per-kind totals before it"""
+        counts = np.zeros((3, days), dtype=np.int64)
+        with self._lock:
+            totals, daily = self._series(seller)
+            for i in range(days):
+                bucket = daily.get(first_day + i)
+                if bucket is not None:
+                    counts[:, i] = bucket
+            after = self._sum_from(daily, first_day + days, self.max_day)
+            before = totals - counts.sum(axis=1) - after
+        return counts, before
+
+    def average_duration_days(self, seller: Optional[int] = None) -> Optional[int]:
+        """Mean warranty period in days over mints that carry an expiry date"""
+        with self._lock:
+            if seller is None:
+                total, count = self.global_duration
+            elif 0 <= seller < len(self.duration_count):
+                total, count = int(self.duration_sum[seller]), int(self.duration_count[seller])
+            else:
+                total, count = 0, 0
+        if not count:
+            return None
+        return int(round(total / count / 86_400_000))
+
+    def same_as(self, other: "Rollups") -> bool:
+        """Whether two rollups hold identical counters, e.g. incremental vs rebuilt"""
+        with self._lock, other._lock:
+            sellers = max(len(self.seller_totals), len(other.seller_totals))
+
+            def padded(values: np.ndarray) -> np.ndarray:
+                shape = (sellers,) + values.shape[1:]
+                out = np.zeros(shape, dtype=np.int64)
+                out[:len(values)] = values
+                return out
+
+            def nonzero(daily: Dict[int, List[int]]) -> Dict[int, List[int]]:
+                return {day: bucket for day, bucket in daily.items() if any(bucket)}
+
+            return (
+                np.array_equal(self.totals, other.totals)
+                and nonzero(self.daily) == nonzero(other.daily)
+                and self.global_duration == other.global_duration
+                and all(np.array_equal(padded(getattr(self, name)), padded(getattr(other, name)))
+                        for name in ("seller_totals", "duration_sum", "duration_count"))
+                and {s: nonzero(d) for s, d in self.seller_daily.items() if nonzero(d)}
+                == {s: nonzero(d) for s, d in other.seller_daily.items() if nonzero(d)}
+                and self.earliest == other.earliest
+            )
@@ -0,0 +1,260 @@
+# snapshot_store.py
+"""Host-wide metrics snapshots shared by every backend worker process.
+This module provides pluggable snapshot backends (a local file-backed store
+and a Redis-compatible adapter) with a named lock, so one process computes
+each metric and every other worker reads the stored result. A designated
+refresher keeps the hottest snapshots current for the whole host.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+from config import Config
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks are process-local only
+    fcntl = None
+
+
+LOCK_SLOTS = 1024
+
+
+class FileSnapshotBackend:
+    """Snapshots as JSON files in a directory.
+
+    Reads come from the OS page cache, so on one host this behaves like a
+    shared-memory segment without a fixed size or layout. Named locks are
+    byte ranges of a single `locks` file, so no file is left behind per key.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or Config.SNAPSHOT_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        self._local_locks: Dict[str, threading.Lock] = {}
+        # slot -> names holding it in this process; POSIX locks are per
+        # process, so a slot is only unlocked when its last holder releases
+        self._slot_holders: Dict[int, int] = {}
+        self._guard = threading.Lock()
+        self._lock_file = open(os.path.join(self.directory, "locks"), "a") if fcntl is not None else None
+
+    def _digest(self, key: str) -> str:
+        return hashlib.sha1(key.encode()).hexdigest()
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{self._digest(key)}{suffix}")
+
+    def read(self, key: str) -> Optional[Tuple[float, Any]]:
+        """(stored_at, value) for key, or None if missing or unreadable"""
+        try:
+            with open(self._path(key, ".json")) as f:
+                entry = json.load(f)
+            return entry["stored_at"], entry["value"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def write(self, key: str, value: Any, stored_at: float):
+        """Atomically replace the snapshot for key"""
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"key": key, "stored_at": stored_at, "value": value}, f, default=str)
+            os.replace(tmp, self._path(key, ".json"))
+        except Exception:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def acquire(self, name: str, lease: float) -> Optional[Any]:
+        """Take the named lock without blocking; returns a handle or None.
+
+        The name maps to one byte of the lock file; the lock is released by
+        the OS if the holder dies. Two names sharing a slot at worst let two
+        processes compute the same value. `lease` is unused here.
+        """
+        with self._guard:
+            local = self._local_locks.setdefault(name, threading.Lock())
+        if not local.acquire(blocking=False):
+            return None
+        if fcntl is None:
+            return (local, None)
+        slot = int(self._digest(name), 16) % LOCK_SLOTS
+        with self._guard:
+            if not self._slot_holders.get(slot):
+                try:
+                    fcntl.lockf(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, slot)
+                except OSError:
+                    local.release()
+                    return None
+            self._slot_holders[slot] = self._slot_holders.get(slot, 0) + 1
+        return (local, slot)
+
+    def renew(self, handle: Any, lease: float) -> bool:
+        """Byte-range locks never expire"""
+        return True
+
+    def release(self, handle: Any):
+        local, slot = handle
+        if slot is not None:
+            with self._guard:
+                self._slot_holders[slot] -= 1
+                if not self._slot_holders[slot]:
+                    del self._slot_holders[slot]
+                    fcntl.lockf(self._lock_file, fcntl.LOCK_UN, 1, slot)
+        local.release()
+
+    def prune(self, max_age: float) -> int:
+        """Delete snapshots and leftover lock files older than max_age seconds"""
+        cutoff = time.time() - max_age
+        removed = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith((".json", ".lock")):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+
+class RedisSnapshotBackend:
+    """Snapshots in Redis, or any client exposing get/set(nx, px)/delete.
+
+    Locks are leases (SET NX PX) so a crashed holder frees them on expiry.
+    """
+
+    def __init__(self, client=None, prefix: str = "warranchain:snapshot:"):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(Config.SNAPSHOT_REDIS_URL)
+        self.client = client
+        self.prefix = prefix
+
+    def read(self, key: str) -> Optional[Tuple[float, Any]]:
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        try:
+            entry = json.loads(raw)
+            return entry["stored_at"], entry["value"]
+        except (ValueError, KeyError):
+            return None
+
+    def write(self, key: str, value: Any, stored_at: float):
+        payload = json.dumps({"stored_at": stored_at, "value": value}, default=str)
+        self.client.set(self.prefix + key, payload, px=int(Config.CACHE_MAX_STALE * 1000))
+
+    def acquire(self, name: str, lease: float) -> Optional[Any]:
+        token = uuid.uuid4().hex
+        if self.client.set(self.prefix + "lock:" + name, token, nx=True, px=int(lease * 1000)):
+            return (name, token)
+        return None
+
+    def renew(self, handle: Any, lease: float) -> bool:
+        """Extend the lease if this handle still owns the lock"""
+        name, token = handle
+        key = self.prefix + "lock:" + name
+        current = self.client.get(key)
+        if isinstance(current, bytes):
+            current = current.decode()
+        if current != token:
+            return False
+        return bool(self.client.set(key, token, xx=True, px=int(lease * 1000)))
+
+    def release(self, handle: Any):
+        name, token = handle
+        key = self.prefix + "lock:" + name
+        current = self.client.get(key)
+        if isinstance(current, bytes):
+            current = current.decode()
+        if current == token:
+            self.client.delete(key)
+
+    def prune(self, max_age: float) -> int:
+        # Snapshots carry their own expiry
+        return 0
+
+
+def create_snapshot_backend(kind: Optional[str] = None):
+    """Backend selected by Config.SNAPSHOT_BACKEND: file, redis or none"""
+    kind = (kind or Config.SNAPSHOT_BACKEND).lower()
+    try:
+        if kind == "file":
+            return FileSnapshotBackend()
+        if kind == "redis":
+            return RedisSnapshotBackend()
+    except Exception as e:
+        print(f"Warning: Could not initialize {kind} snapshot backend: {e}")
+    return None
+
+
+_backend_lock = threading.Lock()
+_shared_backend = None
+_backend_created = False
+
+
+def get_snapshot_backend():
+    """Process-wide snapshot backend, created on first use"""
+    global _shared_backend, _backend_created
+    with _backend_lock:
+        if not _backend_created:
+            _shared_backend = create_snapshot_backend()
+            _backend_created = True
+        return _shared_backend
+
+
+class SnapshotRefresher:
+    """Recomputes registered snapshots on one designated process per host.
+
+    Every worker may start a refresher; only the one holding the refresher
+    lock does any work, and another takes over if that process exits.
+    """
+
+    def __init__(self, cache, jobs: Dict[str, Callable[[], Any]], interval: Optional[float] = None):
+        self.cache = cache
+        self.jobs = jobs
+        self.interval = interval or Config.SNAPSHOT_REFRESH_INTERVAL
+        self.is_leader = False
+        self._handle = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.cache.backend is None or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="snapshot-refresher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        backend = self.cache.backend
+        while not self._stop.is_set():
+            if self._handle is None:
+                # Lease covers a few missed rounds for backends that expire locks
+                self._handle = backend.acquire("refresher", lease=self.interval * 3)
+                self.is_leader = self._handle is not None
+            if self.is_leader:
+                for key, compute in self.jobs.items():
+                    try:
+                        self.cache.publish(key, compute)
+                    except Exception as e:
+                        print(f"Snapshot refresh error for {key}: {str(e)}")
+                backend.prune(self.cache.max_stale)
+                if not backend.renew(self._handle, lease=self.interval * 3):
+                    # Lease lost: another process may have taken over
+                    self._handle = None
+                    self.is_leader = False
+            self._stop.wait(self.interval)
+
+    def stop(self):
+        self._stop.set()
+        if self._handle is not None:
+            self.cache.backend.release(self._handle)
+            self._handle = None
+        self.is_leader = False
@@ -1,43 +1,52 @@
 # sustainability.py
 """Service for calculating sustainability metrics in the WarranChain backend.
-This module fetches blockchain events to compute metrics like resold warranties,
-repair counts, and e-waste saved.
+This module reads blockchain events from the local event index to compute
+metrics like resold warranties, repair counts, and e-waste saved.
 """
-import json
-import time
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-from pysui.sui.sui_clients import sync_client
-from pysui.sui.sui_config import SuiConfig
-from pysui.sui.sui_types import SuiString
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
 from config import Config
+from services.cache import MetricsCache, metrics_cache
+from services.event_ingestion import EventIngestor, event_ingestor
+from services.event_store import EVENT_NAMES
+from services.event_table import KIND_CODES, EventTable
+from services.instrumentation import timed
+from services.snapshot_store import SnapshotRefresher
+
+# Each transfer represents a resale, preventing new product purchase
+EWASTE_PER_TRANSFER = 12  # kg of e-waste prevented per resale
+EWASTE_PER_REPAIR = 8     # kg of e-waste prevented per repair
+# Each resale saves ~0.5 tons CO2, each repair saves ~0.3 tons CO2
+CARBON_PER_TRANSFER = 0.5  # tons CO2 saved per resale
+CARBON_PER_REPAIR = 0.3    # tons CO2 saved per repair
 
 class SustainabilityService:
     """Service for tracking sustainability metrics from blockchain events"""
     
-    def __init__(self):
-        # Initialize Sui client with minimal configuration
-        try:
-            config = SuiConfig.default_config()
-            config.rpc_url = Config.SUI_RPC_URL
-            self.client = sync_client(config)
-        except Exception as e:
-            print(f"Warning: Could not initialize Sui client: {e}")
-            self.client = None
-        self.cache = {}
-        self.cache_duration = 300  # 5 minutes cache
+    def __init__(self, ingestor: Optional[EventIngestor] = None, cache: Optional[MetricsCache] = None):
+        self.ingestor = ingestor or event_ingestor
+        self.cache = cache or metrics_cache  # 5 minutes by default (Config.CACHE_TTL)
+    
+    @property
+    def client(self):
+        """Sui client of the shared ingestor, created on first use"""
+        return self.ingestor.client
     
     def get_sustainability_metrics(self, force_refresh: bool = False) -> Dict:
         """Calculate comprehensive sustainability metrics from blockchain events"""
-        cache_key = "sustainability_metrics"
-        
-        # Return cached data if available and not expired
-        if not force_refresh and cache_key in self.cache:
-            cache_time, cached_data = self.cache[cache_key]
-            if time.time() - cache_time < self.cache_duration:
-                return cached_data
-        
-        metrics = {
+        try:
+            # Stale data is served while a single refresh runs in the background
+            return self.cache.get(
+                "sustainability_metrics",
+                self._compute_sustainability_metrics,
+                force_refresh=force_refresh
+            )
+        except Exception as e:
+            print(f"Sustainability metrics error: {str(e)}")
+            return self._empty_metrics()
+    
+    def _empty_metrics(self) -> Dict:
+        return {
             "total_warranties_transferred": 0,
             "total_repair_events": 0,
             "estimated_ewaste_saved": 0,
@@ -51,111 +60,61 @@ class SustainabilityService:
                 "mints_this_month": 0
             }
         }
+    
+    @timed("global_metrics")
+    def _compute_sustainability_metrics(self) -> Dict:
+        """Recompute metrics from the event index; errors propagate to the cache"""
+        metrics = self._empty_metrics()
         
-        try:
-            # Get all warranty-related events
-            warranty_events = self._get_warranty_events()
-            
-            # Calculate metrics from events
-            metrics.update(self._calculate_metrics_from_events(warranty_events))
-            
-            # Cache the results
-            self.cache[cache_key] = (time.time(), metrics)
-            
-        except Exception as e:
-            print(f"Sustainability metrics error: {str(e)}")
-            # Return cached data if available, otherwise return empty metrics
-            if cache_key in self.cache:
-                return self.cache[cache_key][1]
+        # Get the columnar view of all warranty-related events
+        table = self.ingestor.get_table()
         
+        # Calculate metrics from events
+        metrics.update(self._calculate_metrics_from_table(table))
         return metrics
     
-    def _get_warranty_events(self) -> Dict:
-        """Fetch all warranty-related events from the blockchain"""
-        events = {
-            "transfers": [],
-            "repairs": [],
-            "mints": []
-        }
-        
-        if self.client is None:
-            print("Warning: Sui client not initialized, returning empty events")
-            return events
-        
-        try:
-            # Get WarrantyTransferred events
-            transfer_query = {
-                "MoveEventType": f"{Config.NFT_PACKAGE_ID}::warranty_nft::WarrantyTransferred"
-            }
-            transfer_events = self.client.query_events(query=transfer_query)
-            events["transfers"] = transfer_events.data if hasattr(transfer_events, 'data') else []
-            
-            # Get RepairLogged events
-            repair_query = {
-                "MoveEventType": f"{Config.NFT_PACKAGE_ID}::warranty_nft::RepairLogged"
-            }
-            repair_events = self.client.query_events(query=repair_query)
-            events["repairs"] = repair_events.data if hasattr(repair_events, 'data') else []
-            
-            # Get WarrantyMinted events
-            mint_query = {
-                "MoveEventType": f"{Config.NFT_PACKAGE_ID}::warranty_nft::WarrantyMinted"
-            }
-            mint_events = self.client.query_events(query=mint_query)
-            events["mints"] = mint_events.data if hasattr(mint_events, 'data') else []
-            
-        except Exception as e:
-            print(f"Error fetching events: {str(e)}")
-        
-        return events
+    @timed("event_export")
+    def export_events(self, cursor: int = 0, limit: Optional[int] = None, kinds: Optional[List[str]] = None,
+                      since_ms: Optional[int] = None, until_ms: Optional[int] = None) -> Tuple[int, bool, Iterator[Dict]]:
+        """One page of events after the cursor, as (next cursor, more follow, lazy event iterator).
+
+        The next cursor is the last id the page covers, or the cursor itself
+        for an empty page, so a client always resumes where it stopped.
+        """
+        self.ingestor.sync()
+        store = self.ingestor.store
+        limit = limit or Config.EVENTS_PAGE_LIMIT
+        last_id, has_more = store.page_bounds(cursor, limit, kinds, since_ms, until_ms)
+        rows = store.iter_events(cursor, last_id, kinds, since_ms, until_ms,
+                                 chunk_size=min(limit, Config.EVENTS_STREAM_CHUNK))
+        
+        def events() -> Iterator[Dict]:
+            for row in rows:
+                row["type"] = EVENT_NAMES.get(row["kind"], row["kind"])
+                yield row
+        
+        return max(cursor, last_id), has_more, events()
     
-    def _calculate_metrics_from_events(self, events: Dict) -> Dict:
-        """Calculate sustainability metrics from blockchain events"""
+    def _calculate_metrics_from_table(self, table: EventTable) -> Dict:
+        """Calculate sustainability metrics from the columnar event table"""
         metrics = {}
         
-        # Count total events
-        total_transfers = len(events["transfers"])
-        total_repairs = len(events["repairs"])
-        total_mints = len(events["mints"])
-        
-        # Calculate monthly breakdown
+        # Total and this-month counts per kind are rollup lookups
         current_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        transfers_this_month = 0
-        repairs_this_month = 0
-        mints_this_month = 0
-        
-        # Process transfer events
-        for event in events["transfers"]:
-            if hasattr(event, 'timestamp_ms'):
-                event_time = datetime.fromtimestamp(int(event.timestamp_ms) / 1000)
-                if event_time >= current_month:
-                    transfers_this_month += 1
+        totals, this_month = table.kind_counts(since_ms=int(current_month.timestamp() * 1000))
         
-        # Process repair events
-        for event in events["repairs"]:
-            if hasattr(event, 'timestamp_ms'):
-                event_time = datetime.fromtimestamp(int(event.timestamp_ms) / 1000)
-                if event_time >= current_month:
-                    repairs_this_month += 1
-        
-        # Process mint events
-        for event in events["mints"]:
-            if hasattr(event, 'timestamp_ms'):
-                event_time = datetime.fromtimestamp(int(event.timestamp_ms) / 1000)
-                if event_time >= current_month:
-                    mints_this_month += 1
+        total_transfers = int(totals[KIND_CODES["transfers"]])
+        total_repairs = int(totals[KIND_CODES["repairs"]])
+        total_mints = int(totals[KIND_CODES["mints"]])
+        transfers_this_month = int(this_month[KIND_CODES["transfers"]])
+        repairs_this_month = int(this_month[KIND_CODES["repairs"]])
+        mints_this_month = int(this_month[KIND_CODES["mints"]])
         
         # Calculate e-waste saved (more sophisticated calculation)
-        # Each transfer represents a resale, preventing new product purchase
-        ewaste_per_transfer = 12  # kg of e-waste prevented per resale
-        ewaste_per_repair = 8     # kg of e-waste prevented per repair
-        total_ewaste_saved = (total_transfers * ewaste_per_transfer) + (total_repairs * ewaste_per_repair)
+        total_ewaste_saved = (total_transfers * EWASTE_PER_TRANSFER) + (total_repairs * EWASTE_PER_REPAIR)
         
         # Calculate carbon footprint reduction
-        # Each resale saves ~0.5 tons CO2, each repair saves ~0.3 tons CO2
-        carbon_per_transfer = 0.5  # tons CO2 saved per resale
-        carbon_per_repair = 0.3    # tons CO2 saved per repair
-        total_carbon_reduced = (total_transfers * carbon_per_transfer) + (total_repairs * carbon_per_repair)
+        total_carbon_reduced = (total_transfers * CARBON_PER_TRANSFER) + (total_repairs * CARBON_PER_REPAIR)
         
         # Active warranties (minted - transferred)
         active_warranties = max(0, total_mints - total_transfers)
@@ -179,31 +138,11 @@ class SustainabilityService:
     def get_user_sustainability_metrics(self, user_address: str) -> Dict:
         """Get sustainability metrics for a specific user"""
         try:
-            # Get user's warranty NFTs
-            user_warranties = self.client.get_objects(
-                owner=user_address,
-                filter={"Package": Config.NFT_PACKAGE_ID}
+            return self.cache.get(
+                f"user_metrics_{user_address}",
+                lambda: self._compute_user_metrics(user_address)
             )
             
-            user_metrics = {
-                "user_warranties_owned": len(user_warranties.data) if hasattr(user_warranties, 'data') else 0,
-                "user_repair_events": 0,
-                "user_transfers_made": 0,
-                "user_ewaste_contribution": 0
-            }
-            
-            # Calculate user-specific metrics
-            if hasattr(user_warranties, 'data'):
-                for warranty in user_warranties.data:
-                    # Get warranty details to count repair events
-                    warranty_details = self.client.get_object(warranty.object_id)
-                    if hasattr(warranty_details, 'data'):
-                        # Parse warranty data to count repair events
-                        # This would need to be implemented based on your NFT structure
-                        pass
-            
-            return user_metrics
-            
         except Exception as e:
             print(f"Error getting user metrics: {str(e)}")
             return {
@@ -213,36 +152,49 @@ class SustainabilityService:
                 "user_ewaste_contribution": 0
             }
     
+    @timed("user_metrics")
+    def _compute_user_metrics(self, user_address: str) -> Dict:
+        """Derive a user's holdings from the event index instead of per-object RPCs"""
+        # Ownership follows WarrantyMinted.owner and then each WarrantyTransferred.to
+        table = self.ingestor.get_table()
+        counts = table.owner_counts(user_address)
+        
+        user_ewaste = counts["transfers_sent"] * EWASTE_PER_TRANSFER + counts["repairs"] * EWASTE_PER_REPAIR
+        
+        return {
+            "user_warranties_owned": counts["owned"],
+            "user_repair_events": counts["repairs"],
+            "user_transfers_made": counts["transfers_sent"],
+            "user_ewaste_contribution": user_ewaste
+        }
+    
+    @timed("global_trends")
     def get_sustainability_trends(self, days: int = 30) -> Dict:
         """Get sustainability trends over the specified number of days"""
         try:
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days)
+            table = self.ingestor.get_table()
+            dates, counts, before = table.daily_counts(days)
+            
+            transfers = counts[KIND_CODES["transfers"]]
+            repairs = counts[KIND_CODES["repairs"]]
+            mints = counts[KIND_CODES["mints"]]
+            
+            # Running totals include everything recorded before the window
+            cumulative_transfers = before[KIND_CODES["transfers"]] + transfers.cumsum()
+            cumulative_repairs = before[KIND_CODES["repairs"]] + repairs.cumsum()
+            cumulative_ewaste = cumulative_transfers * EWASTE_PER_TRANSFER + cumulative_repairs * EWASTE_PER_REPAIR
+            cumulative_carbon = cumulative_transfers * CARBON_PER_TRANSFER + cumulative_repairs * CARBON_PER_REPAIR
             
             trends = {
-                "daily_transfers": [],
-                "daily_repairs": [],
-                "daily_mints": [],
-                "cumulative_ewaste": []
+                "daily_transfers": [{"date": d, "count": int(c)} for d, c in zip(dates, transfers)],
+                "daily_repairs": [{"date": d, "count": int(c)} for d, c in zip(dates, repairs)],
+                "daily_mints": [{"date": d, "count": int(c)} for d, c in zip(dates, mints)],
+                "cumulative_ewaste": [
+                    {"date": d, "ewaste_saved": int(e), "carbon_reduced": round(float(c), 2)}
+                    for d, e, c in zip(dates, cumulative_ewaste, cumulative_carbon)
+                ]
             }
             
-            # This would require more sophisticated event querying with date filters
-            # For now, return placeholder data
-            for i in range(days):
-                date = start_date + timedelta(days=i)
-                trends["daily_transfers"].append({
-                    "date": date.strftime("%Y-%m-%d"),
-                    "count": 0  # Would be calculated from actual events
-                })
-                trends["daily_repairs"].append({
-                    "date": date.strftime("%Y-%m-%d"),
-                    "count": 0
-                })
-                trends["daily_mints"].append({
-                    "date": date.strftime("%Y-%m-%d"),
-                    "count": 0
-                })
-            
             return trends
             
         except Exception as e:
@@ -252,6 +204,12 @@ class SustainabilityService:
 # Global service instance
 sustainability_service = SustainabilityService()
 
+# Keeps the global metrics snapshot current for every worker on the host
+snapshot_refresher = SnapshotRefresher(
+    metrics_cache,
+    {"sustainability_metrics": sustainability_service._compute_sustainability_metrics}
+)
+
 def get_sustainability_metrics():
     """Legacy function for backward compatibility"""
     return sustainability_service.get_sustainability_metrics()
\ No newline at end of file
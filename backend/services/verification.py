@@ -0,0 +1,149 @@
+# verification.py
+"""Warranty verification service for the WarranChain backend.
+This module answers QR-code and serial-number scans from the local event
+index: validity, current owner, expiry and repair count per warranty. Hot
+results are kept in an LRU cache that is invalidated whenever a mint,
+transfer or repair for that NFT is ingested, and batches are resolved with
+one pass over the index.
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+from config import Config
+from services.event_ingestion import EventIngestor, event_ingestor
+from services.event_store import normalize_address
+from services.event_table import NO_ADDRESS, EventTable
+from services.instrumentation import registry
+
+DAY_MS = 86_400_000
+
+
+class VerificationService:
+    """Resolves NFT ids and serial numbers to warranty status"""
+
+    def __init__(self, ingestor: Optional[EventIngestor] = None, max_entries: Optional[int] = None):
+        self.ingestor = ingestor or event_ingestor
+        self.max_entries = max_entries or Config.VERIFY_CACHE_MAX_ENTRIES
+        # nft_id -> static warranty facts, least recently used first
+        self._cache: "OrderedDict[str, Dict]" = OrderedDict()
+        # Table rows already checked for invalidations
+        self._covered = 0
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _catch_up(self) -> EventTable:
+        """Refresh the index and drop cached NFTs touched by newly ingested events"""
+        table = self.ingestor.get_table()
+        nfts, = table.columns("nft")
+        with self._lock:
+            start, self._covered = self._covered, len(nfts)
+            if not self._cache:
+                return table
+            for nft in set(nfts[start:].tolist()):
+                if nft != NO_ADDRESS and self._cache.pop(table.nft_ids[nft], None) is not None:
+                    self.stats["invalidations"] += 1
+        return table
+
+    @staticmethod
+    def _resolve_id(table: EventTable, nft_id: str) -> str:
+        """Match the id as indexed, accepting short or mixed-case addresses"""
+        if nft_id in table.nft_index:
+            return nft_id
+        return normalize_address(nft_id) or nft_id
+
+    def _load(self, table: EventTable, nft_ids: List[str]) -> Dict[str, Dict]:
+        """Static facts for NFTs missing from the cache, in one pass over the index"""
+        mints = self.ingestor.store.get_mints(nft_ids)
+        owners = table.current_owners()
+        repairs = table.repair_counts()
+        facts = {}
+        for nft_id in nft_ids:
+            mint = mints.get(nft_id)
+            nft = table.nft_index.get(nft_id)
+            if mint is None or nft is None:
+                facts[nft_id] = {"nft_id": nft_id, "found": False}
+                continue
+            owner = owners[nft] if nft < len(owners) else NO_ADDRESS
+            parsed = mint["parsed_json"]
+            facts[nft_id] = {
+                "nft_id": nft_id,
+                "found": True,
+                "serial_number": mint["serial_number"],
+                "product_name": parsed.get("product_name"),
+                "manufacturer": parsed.get("manufacturer"),
+                "seller": mint["sender"],
+                "owner": table.addresses[owner] if owner != NO_ADDRESS else None,
+                "minted_at": mint["timestamp_ms"],
+                "expiry_date": mint["expiry_date"],
+                "repair_count": int(repairs[nft]) if nft < len(repairs) else 0
+            }
+        return facts
+
+    @staticmethod
+    def _status(facts: Dict, now_ms: int) -> Dict:
+        """Add the time-dependent validity fields to cached facts"""
+        result = dict(facts)
+        if not facts["found"]:
+            result["valid"] = False
+            return result
+        expiry = facts["expiry_date"] or 0
+        result["is_expired"] = expiry <= now_ms
+        result["valid"] = not result["is_expired"]
+        result["days_left"] = max(0, -(-(expiry - now_ms) // DAY_MS))
+        result["expires_at"] = datetime.fromtimestamp(expiry / 1000).isoformat() if expiry else None
+        return result
+
+    def verify_many(self, nft_ids: List[str]) -> List[Dict]:
+        """Verification results for a list of NFT ids, in request order"""
+        table = self._catch_up()
+        resolved = [self._resolve_id(table, nft_id) for nft_id in nft_ids]
+
+        found: Dict[str, Dict] = {}
+        with self._lock:
+            for nft_id in dict.fromkeys(resolved):
+                facts = self._cache.get(nft_id)
+                if facts is not None:
+                    self._cache.move_to_end(nft_id)
+                    found[nft_id] = facts
+            self.stats["hits"] += len(found)
+
+        missing = [nft_id for nft_id in dict.fromkeys(resolved) if nft_id not in found]
+        if missing:
+            loaded = self._load(table, missing)
+            found.update(loaded)
+            with self._lock:
+                self.stats["misses"] += len(missing)
+                self._cache.update(loaded)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+
+        now_ms = int(time.time() * 1000)
+        return [self._status(found[nft_id], now_ms) for nft_id in resolved]
+
+    def verify(self, nft_id: str) -> Dict:
+        """Verification result for one NFT id"""
+        return self.verify_many([nft_id])[0]
+
+    def verify_serials(self, serials: List[str]) -> List[Dict]:
+        """Verification results for serial numbers, in request order"""
+        nft_ids = self.ingestor.store.nft_ids_for_serials(list(dict.fromkeys(serials)))
+        results = self.verify_many([nft_ids.get(serial, "") for serial in serials])
+        for serial, result in zip(serials, results):
+            if serial not in nft_ids:
+                result.update({"nft_id": None, "serial_number": serial})
+        return results
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._cache)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0
+        return stats
+
+
+# Global verification service
+verification_service = VerificationService()
+registry.register_collector("warranchain_verification", verification_service.get_stats)
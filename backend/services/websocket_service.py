@@ -6,66 +6,210 @@ and notify connected clients about sustainability metrics updates.
 import asyncio
 import json
 import logging
+import time
 import websockets
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Set
-from pysui.sui.sui_clients import sync_client
-from pysui.sui.sui_config import SuiConfig
+from typing import Dict, List, Optional, Set, Tuple
 from config import Config
+from services.cache import metrics_cache
+from services.event_ingestion import EventIngestor, event_ingestor
+from services.event_store import EVENT_NAMES, normalize_address
+from services.event_table import KIND_CODES
+from services.instrumentation import registry
+from services.sustainability import (
+    CARBON_PER_REPAIR, CARBON_PER_TRANSFER, EWASTE_PER_REPAIR, EWASTE_PER_TRANSFER
+)
 
 logger = logging.getLogger(__name__)
 
+broadcast_seconds = registry.histogram(
+    "warranchain_ws_broadcast_seconds", "Time to serialize and enqueue one broadcast", ["type"]
+)
+messages_queued = registry.counter(
+    "warranchain_ws_messages_queued_total", "Messages queued for WebSocket clients"
+)
+messages_dropped = registry.counter(
+    "warranchain_ws_messages_dropped_total", "Messages dropped from full client send queues"
+)
+
+# Subscription filter name -> event field it matches against
+SUBSCRIPTION_FIELDS = {
+    "sellers": "seller",
+    "owners": "owner",
+    "nft_ids": "nft_id"
+}
+
+class ClientConnection:
+    """A connected client with its subscription filters and bounded send queue"""
+    
+    def __init__(self, websocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.event_types: Set[str] = set()
+        self.filters: Dict[str, Set[str]] = {name: set() for name in SUBSCRIPTION_FIELDS}
+        self.dropped = 0
+        self.writer: Optional[asyncio.Task] = None
+    
+    def subscribe(self, data: Dict) -> List[str]:
+        """Replace the client's filters; empty filters match everything.
+
+        Addresses are normalized like the events they are matched against.
+        Returns the problems found, in which case nothing is changed.
+        """
+        errors = []
+        event_types = data.get("events", [])
+        if not isinstance(event_types, list):
+            errors.append("events must be a list")
+        else:
+            unknown = [e for e in event_types if e not in EVENT_NAMES.values()]
+            if unknown:
+                errors.append(f"Unknown events: {unknown}")
+        filters = {}
+        for name in SUBSCRIPTION_FIELDS:
+            values = data.get(name, [])
+            if not isinstance(values, list):
+                errors.append(f"{name} must be a list")
+                continue
+            normalized = [normalize_address(v) for v in values]
+            invalid = [v for v, n in zip(values, normalized) if n is None]
+            if invalid:
+                errors.append(f"Invalid {name}: {invalid}")
+            filters[name] = set(normalized)
+        if errors:
+            return errors
+        self.event_types = set(event_types)
+        self.filters.update(filters)
+        return []
+    
+    def wants(self, event_type: str, event: Dict) -> bool:
+        """Whether a blockchain event matches this client's subscription"""
+        if self.event_types and event_type not in self.event_types:
+            return False
+        for name, field in SUBSCRIPTION_FIELDS.items():
+            wanted = self.filters[name]
+            if not wanted:
+                continue
+            values = {event.get(field)}
+            if name == "owners":
+                # A transfer concerns both the sender and the recipient
+                values.add(event.get("from_address"))
+            if not wanted & values:
+                return False
+        return True
+    
+    def enqueue(self, message: str):
+        """Queue a message without blocking, dropping the oldest one when full"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            messages_dropped.inc()
+        self.queue.put_nowait(message)
+    
+    def describe(self) -> Dict:
+        subscription = {name: sorted(values) for name, values in self.filters.items()}
+        subscription["events"] = sorted(self.event_types)
+        return subscription
+
 class WebSocketService:
-    """Service for managing WebSocket connections and real-time event tracking"""
+    """Service for managing WebSocket connections and real-time event tracking.
+
+    Only the holder of the "chain_tail" lock on the shared snapshot backend
+    force-syncs from the chain on every poll; every other worker tails the
+    shared event index without syncing.
+    """
     
-    def __init__(self):
-        self.clients: Set[websockets.WebSocketServerProtocol] = set()
-        self.sui_client = sync_client(SuiConfig.default_config(Config.SUI_RPC_URL))
-        self.event_subscriptions = {}
+    def __init__(self, ingestor: EventIngestor = None, backend=None):
+        self.clients: Dict[websockets.WebSocketServerProtocol, ClientConnection] = {}
+        self.ingestor = ingestor or event_ingestor
+        self._backend = backend
+        self._leader = None
         self.is_running = False
+        # Store id of the last event pushed to clients, and running totals
+        self.last_event_id = None
+        self.aggregates = None
+        # Precomputed metrics served to clients without touching the chain
+        self.snapshot: Optional[Dict] = None
+        self.snapshot_at = 0.0
+        # Blocking Sui/index work runs here, never on the event loop
+        self.executor = ThreadPoolExecutor(
+            max_workers=Config.WS_EXECUTOR_WORKERS, thread_name_prefix="ws-blocking"
+        )
+        self._poll: Optional[asyncio.Future] = None
+    
+    async def run_blocking(self, func, *args, timeout: Optional[float] = None):
+        """Run a blocking call on the executor, bounded by a timeout"""
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, func, *args)
+        return await asyncio.wait_for(future, timeout or Config.WS_BLOCKING_TIMEOUT)
+    
+    def current_metrics(self) -> Dict:
+        """Latest metrics snapshot, falling back to the running totals"""
+        if self.snapshot is not None:
+            return self.snapshot
+        return dict(self.aggregates or {})
     
     async def register(self, websocket: websockets.WebSocketServerProtocol):
         """Register a new WebSocket client"""
-        self.clients.add(websocket)
+        connection = ClientConnection(websocket, Config.WS_SEND_QUEUE_SIZE)
+        connection.writer = asyncio.create_task(self._write_loop(connection))
+        self.clients[websocket] = connection
         logger.info(f"Client connected. Total clients: {len(self.clients)}")
         
-        # Send initial sustainability metrics
+        # Send initial sustainability metrics from the precomputed snapshot
         try:
-            from services.sustainability import sustainability_service
-            metrics = sustainability_service.get_sustainability_metrics()
-            await websocket.send(json.dumps({
+            await self.send(websocket, {
                 "type": "initial_metrics",
-                "data": metrics,
+                "data": self.current_metrics(),
                 "timestamp": datetime.now().isoformat()
-            }))
+            })
         except Exception as e:
             logger.error(f"Error sending initial metrics: {str(e)}")
     
     async def unregister(self, websocket: websockets.WebSocketServerProtocol):
         """Unregister a WebSocket client"""
-        self.clients.remove(websocket)
+        connection = self.clients.pop(websocket, None)
+        if connection is None:
+            return
+        if connection.writer is not None and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
         logger.info(f"Client disconnected. Total clients: {len(self.clients)}")
     
-    async def broadcast(self, message: Dict):
-        """Broadcast a message to all connected clients"""
+    async def _write_loop(self, connection: ClientConnection):
+        """Drain one client's queue so a slow socket never blocks a broadcast"""
+        try:
+            while True:
+                message = await connection.queue.get()
+                await asyncio.wait_for(connection.websocket.send(message), Config.WS_SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except websockets.exceptions.ConnectionClosed:
+            await self.unregister(connection.websocket)
+        except Exception as e:
+            logger.error(f"Error sending to client: {str(e)}")
+            await self.unregister(connection.websocket)
+    
+    async def send(self, websocket: websockets.WebSocketServerProtocol, message: Dict):
+        """Queue a message for a single client"""
+        connection = self.clients.get(websocket)
+        if connection is not None:
+            connection.enqueue(json.dumps(message))
+    
+    async def broadcast(self, message: Dict, event: Optional[Dict] = None):
+        """Broadcast a message to all connected clients, or to the subscribers of an event"""
         if not self.clients:
             return
         
-        message_str = json.dumps(message)
-        disconnected_clients = set()
-        
-        for client in self.clients:
-            try:
-                await client.send(message_str)
-            except websockets.exceptions.ConnectionClosed:
-                disconnected_clients.add(client)
-            except Exception as e:
-                logger.error(f"Error broadcasting to client: {str(e)}")
-                disconnected_clients.add(client)
-        
-        # Remove disconnected clients
-        for client in disconnected_clients:
-            await self.unregister(client)
+        with broadcast_seconds.time(type=message.get("type")):
+            # Serialize once, then hand the same string to every matching queue
+            message_str = json.dumps(message)
+            event_type = message.get("event_type")
+            queued = 0
+            for connection in list(self.clients.values()):
+                if event is None or connection.wants(event_type, event):
+                    connection.enqueue(message_str)
+                    queued += 1
+            messages_queued.inc(queued)
     
     async def broadcast_sustainability_update(self, metrics: Dict):
         """Broadcast sustainability metrics update to all clients"""
@@ -84,6 +228,15 @@ class WebSocketService:
             "data": event_data,
             "timestamp": datetime.now().isoformat()
         }
+        await self.broadcast(message, event=event_data)
+    
+    async def broadcast_sustainability_delta(self, delta: Dict):
+        """Broadcast an incremental change to the running sustainability totals"""
+        message = {
+            "type": "sustainability_delta",
+            "data": delta,
+            "timestamp": datetime.now().isoformat()
+        }
         await self.broadcast(message)
     
     async def start_event_monitoring(self):
@@ -93,50 +246,150 @@ class WebSocketService:
         
         while self.is_running:
             try:
+                if self.last_event_id is None:
+                    # Start the tail at the current end of the index
+                    self.last_event_id = await self.run_blocking(self._init_tail)
+                
+                if time.time() - self.snapshot_at >= Config.WS_SNAPSHOT_INTERVAL:
+                    await self.run_blocking(self._refresh_snapshot)
+                
                 # Monitor for new warranty events
                 await self._check_for_new_events()
                 
                 # Wait before next check
-                await asyncio.sleep(30)  # Check every 30 seconds
+                await asyncio.sleep(Config.WS_POLL_INTERVAL)
                 
             except Exception as e:
                 logger.error(f"Error in event monitoring: {str(e)}")
-                await asyncio.sleep(60)  # Wait longer on error
+                await asyncio.sleep(max(5, Config.WS_POLL_INTERVAL * 10))  # Wait longer on error
+    
+    def _init_tail(self) -> Optional[int]:
+        """Seed the running totals from the event index and return its end"""
+        table = self.ingestor.get_table()
+        totals, _ = table.kind_counts()
+        self.aggregates = {
+            "total_warranties_minted": int(totals[KIND_CODES["mints"]]),
+            "total_warranties_transferred": int(totals[KIND_CODES["transfers"]]),
+            "total_repair_events": int(totals[KIND_CODES["repairs"]]),
+            "estimated_ewaste_saved": 0,
+            "carbon_footprint_reduced": 0,
+            "active_warranties": 0
+        }
+        self._apply_events([])
+        return table.last_id
+    
+    def _refresh_snapshot(self):
+        """Recompute the full metrics snapshot (runs on the executor)"""
+        from services.sustainability import sustainability_service
+        metrics = dict(sustainability_service.get_sustainability_metrics())
+        metrics["event_breakdown"] = dict(metrics.get("event_breakdown", {}))
+        # Running totals may already include events newer than the cached metrics
+        metrics.update(self.aggregates or {})
+        self.snapshot = metrics
+        self.snapshot_at = time.time()
+    
+    def _apply_events(self, events: List[Dict]) -> Dict:
+        """Fold new events into the running totals and return the change"""
+        delta = {kind: 0 for kind in KIND_CODES}
+        for event in events:
+            delta[event["kind"]] += 1
+        
+        totals = self.aggregates
+        totals["total_warranties_minted"] += delta["mints"]
+        totals["total_warranties_transferred"] += delta["transfers"]
+        totals["total_repair_events"] += delta["repairs"]
+        transfers = totals["total_warranties_transferred"]
+        repairs = totals["total_repair_events"]
+        totals["estimated_ewaste_saved"] = transfers * EWASTE_PER_TRANSFER + repairs * EWASTE_PER_REPAIR
+        totals["carbon_footprint_reduced"] = round(transfers * CARBON_PER_TRANSFER + repairs * CARBON_PER_REPAIR, 2)
+        totals["active_warranties"] = max(0, totals["total_warranties_minted"] - transfers)
+        
+        if self.snapshot is not None:
+            snapshot = dict(self.snapshot)
+            snapshot.update(totals)
+            breakdown = dict(snapshot.get("event_breakdown", {}))
+            for kind, count in delta.items():
+                name = f"{kind}_this_month"
+                breakdown[name] = breakdown.get(name, 0) + count
+            snapshot["event_breakdown"] = breakdown
+            snapshot["last_updated"] = datetime.now().isoformat()
+            self.snapshot = snapshot
+        
+        return {"new_events": delta, "totals": dict(totals)}
     
     async def _check_for_new_events(self):
         """Check for new blockchain events and broadcast updates"""
         try:
-            # Get recent events
-            from services.sustainability import sustainability_service
+            if self._poll is None:
+                # Pull new pages and read everything stored after our cursor
+                loop = asyncio.get_running_loop()
+                self._poll = loop.run_in_executor(self.executor, self._get_recent_events, self.last_event_id)
+            elif not self._poll.done():
+                # A poll that outlived its timeout is still running; skip this tick
+                return
             
-            # Get events from the last 5 minutes
-            recent_events = self._get_recent_events()
+            poll = self._poll
+            try:
+                recent_events, last_id = await asyncio.wait_for(asyncio.shield(poll), Config.WS_BLOCKING_TIMEOUT)
+            except asyncio.TimeoutError:
+                # Its events are broadcast on the tick that finds it done
+                logger.warning("Event poll is slow; its events will follow on a later tick")
+                return
+            finally:
+                if poll.done():
+                    self._poll = None
             
             if recent_events:
-                # Update sustainability metrics
-                metrics = sustainability_service.get_sustainability_metrics(force_refresh=True)
-                
-                # Broadcast updates
-                await self.broadcast_sustainability_update(metrics)
+                # Update the running totals incrementally and push the change
+                delta = self._apply_events(recent_events)
+                await self.broadcast_sustainability_delta(delta)
                 
                 # Broadcast individual events
                 for event in recent_events:
-                    await self.broadcast_event(event["type"], event["data"])
+                    await self.broadcast_event(EVENT_NAMES[event["kind"]], event)
+                    # Let client writers drain between events of a burst
+                    await asyncio.sleep(0)
+            
+            # Only handled rows move the cursor
+            self.last_event_id = last_id
                     
         except Exception as e:
             logger.error(f"Error checking for new events: {str(e)}")
     
-    def _get_recent_events(self) -> List[Dict]:
-        """Get recent blockchain events (last 5 minutes)"""
+    @property
+    def backend(self):
+        """Snapshot backend holding the leader lock; the metrics cache's by default"""
+        return self._backend if self._backend is not None else metrics_cache.backend
+    
+    def _is_leader(self) -> bool:
+        """Take or renew the chain tail lock (runs on the executor)"""
+        if self.backend is None:
+            return True
+        # Renewed every poll; covers a poll that runs up to its timeout
+        lease = max(Config.WS_POLL_INTERVAL, Config.WS_BLOCKING_TIMEOUT) * 3
+        if self._leader is not None and not self.backend.renew(self._leader, lease=lease):
+            self._leader = None
+        if self._leader is None:
+            self._leader = self.backend.acquire("chain_tail", lease=lease)
+        return self._leader is not None
+    
+    def _get_recent_events(self, after_id: Optional[int]) -> Tuple[List[Dict], Optional[int]]:
+        """Events ingested after `after_id`, with the id to resume from"""
         events = []
         try:
-            # This would need to be implemented based on your specific event structure
-            # For now, return empty list
-            pass
+            if self._is_leader():
+                self.ingestor.sync(force=True)
+            events = self.ingestor.store.get_events_since(after_id)
+            if events:
+                # Attach the minting seller so clients can filter by seller;
+                # the table only reads the index, syncing is the leader's job
+                table = self.ingestor.get_table(sync=False)
+                for event in events:
+                    event["seller"] = table.seller_of(event["nft_id"])
         except Exception as e:
             logger.error(f"Error getting recent events: {str(e)}")
         
-        return events
+        return events, events[-1]["id"] if events else after_id
     
     async def handle_client_message(self, websocket: websockets.WebSocketServerProtocol, message: str):
         """Handle incoming messages from WebSocket clients"""
@@ -146,50 +399,65 @@ class WebSocketService:
             
             if message_type == "subscribe_events":
                 # Client wants to subscribe to specific events
-                event_types = data.get("events", [])
-                await self._subscribe_to_events(websocket, event_types)
+                await self._subscribe_to_events(websocket, data)
                 
             elif message_type == "get_metrics":
                 # Client requests current metrics
-                from services.sustainability import sustainability_service
-                metrics = sustainability_service.get_sustainability_metrics()
-                await websocket.send(json.dumps({
+                await self.send(websocket, {
                     "type": "metrics_response",
-                    "data": metrics,
+                    "data": self.current_metrics(),
                     "timestamp": datetime.now().isoformat()
-                }))
+                })
                 
             elif message_type == "ping":
                 # Respond to ping
-                await websocket.send(json.dumps({
+                await self.send(websocket, {
                     "type": "pong",
                     "timestamp": datetime.now().isoformat()
-                }))
+                })
                 
         except json.JSONDecodeError:
             logger.error("Invalid JSON message received")
         except Exception as e:
             logger.error(f"Error handling client message: {str(e)}")
     
-    async def _subscribe_to_events(self, websocket: websockets.WebSocketServerProtocol, event_types: List[str]):
-        """Subscribe a client to specific event types"""
-        # Store subscription preferences for this client
-        # This could be implemented with a more sophisticated subscription system
-        await websocket.send(json.dumps({
+    async def _subscribe_to_events(self, websocket: websockets.WebSocketServerProtocol, data: Dict):
+        """Subscribe a client to event types, sellers, owners and NFT ids"""
+        connection = self.clients.get(websocket)
+        if connection is None:
+            return
+        errors = connection.subscribe(data)
+        if errors:
+            await self.send(websocket, {
+                "type": "subscription_error",
+                "errors": errors,
+                "timestamp": datetime.now().isoformat()
+            })
+            return
+        subscription = connection.describe()
+        await self.send(websocket, {
             "type": "subscription_confirmed",
-            "events": event_types,
+            **subscription,
             "timestamp": datetime.now().isoformat()
-        }))
+        })
     
     def stop(self):
         """Stop the WebSocket service"""
         self.is_running = False
+        self.executor.shutdown(wait=False)
+        if self._leader is not None:
+            self.backend.release(self._leader)
+            self._leader = None
         logger.info("WebSocket service stopped")
 
 # Global WebSocket service instance
 websocket_service = WebSocketService()
+registry.gauge(
+    "warranchain_ws_clients", "Connected WebSocket clients",
+    callback=lambda: len(websocket_service.clients)
+)
 
-async def websocket_handler(websocket, path):
+async def websocket_handler(websocket, path=None):
     """Main WebSocket handler function"""
     await websocket_service.register(websocket)
     
@@ -201,20 +469,22 @@ async def websocket_handler(websocket, path):
     finally:
         await websocket_service.unregister(websocket)
 
-def start_websocket_server(host: str = "localhost", port: int = 8765):
-    """Start the WebSocket server"""
-    import asyncio
+async def serve_websockets(host: str = "localhost", port: int = 8765):
+    """Run the standalone WebSocket server on the current event loop"""
+    # Start event monitoring in background
+    monitor = asyncio.create_task(websocket_service.start_event_monitoring())
     
-    async def main():
-        # Start event monitoring in background
-        asyncio.create_task(websocket_service.start_event_monitoring())
-        
-        # Start WebSocket server
+    # Start WebSocket server
+    try:
         async with websockets.serve(websocket_handler, host, port):
             logger.info(f"WebSocket server started on ws://{host}:{port}")
             await asyncio.Future()  # Run forever
-    
-    asyncio.run(main())
+    finally:
+        monitor.cancel()
+
+def start_websocket_server(host: str = "localhost", port: int = 8765):
+    """Start the WebSocket server"""
+    asyncio.run(serve_websockets(host, port))
 
 if __name__ == "__main__":
     start_websocket_server()
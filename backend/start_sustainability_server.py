@@ -2,14 +2,16 @@
 """
 Startup script for WarranChain Sustainability Dashboard Backend
 Runs both the Flask API server and WebSocket server for real-time updates.
+For production use asgi.py, which serves both from one event loop.
 """
 
-import asyncio
 import threading
 import time
 import logging
 from flask import Flask
 from services.websocket_service import start_websocket_server
+from services.notifications import notification_service
+from services.sustainability import snapshot_refresher
 from app import app
 
 # Configure logging
@@ -31,7 +33,7 @@ def start_websocket_server_wrapper():
     """Start the WebSocket server in a separate thread"""
     try:
         logger.info("Starting WebSocket server on ws://localhost:8765")
-        asyncio.run(start_websocket_server())
+        start_websocket_server()
     except Exception as e:
         logger.error(f"Error starting WebSocket server: {str(e)}")
 
@@ -50,6 +52,12 @@ def main():
     websocket_thread = threading.Thread(target=start_websocket_server_wrapper, daemon=True)
     websocket_thread.start()
     
+    # Keep the shared metrics snapshot fresh for other processes on this host
+    snapshot_refresher.start()
+    
+    # Send warranty expiry reminders from this process
+    notification_service.start()
+    
     logger.info("Both servers started successfully!")
     logger.info("API Server: http://localhost:5000")
     logger.info("WebSocket Server: ws://localhost:8765")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the metrics cache: single-flight refreshes, serving stale
+values while one refresh runs, and LRU/TTL eviction.
+"""
+
+import threading
+import time
+import pytest
+from services.cache import MetricsCache
+
+
+def test_concurrent_misses_compute_once():
+    cache = MetricsCache(ttl=60, min_force_interval=0)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"value": 1}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get("k", compute))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert results == [{"value": 1}] * 8
+
+
+def test_stale_value_is_served_while_refreshing():
+    cache = MetricsCache(ttl=0.05, min_force_interval=0, max_stale=60)
+    cache.get("k", lambda: "old")
+    time.sleep(0.1)
+    release = threading.Event()
+
+    def slow_compute():
+        release.wait(5)
+        return "new"
+
+    started = time.perf_counter()
+    assert cache.get("k", slow_compute) == "old"
+    assert time.perf_counter() - started < 1
+    # A second stale read does not start another refresh
+    assert cache.get("k", slow_compute) == "old"
+    assert cache.stats()["refreshes_in_flight"] == 1
+    release.set()
+    deadline = time.time() + 5
+    while cache.stats()["refreshes_in_flight"] and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.get("k", lambda: "unused") == "new"
+    assert cache.stats()["stale_hits"] == 2
+
+
+def test_forced_refreshes_are_rate_limited():
+    cache = MetricsCache(ttl=60, min_force_interval=60)
+    values = iter(range(10))
+    first = cache.get("k", lambda: next(values))
+    assert cache.get("k", lambda: next(values), force_refresh=True) == first + 1
+    # A second forced refresh within the interval is served from the cache
+    assert cache.get("k", lambda: next(values), force_refresh=True) == first + 1
+    assert cache.stats()["forced_refreshes_throttled"] == 1
+
+
+def test_failed_first_compute_raises_and_is_not_cached():
+    cache = MetricsCache(ttl=60)
+
+    def broken():
+        raise RuntimeError("chain unavailable")
+
+    with pytest.raises(RuntimeError, match="chain unavailable"):
+        cache.get("k", broken)
+    assert cache.get("k", lambda: "ok") == "ok"
+
+
+def test_least_recently_used_entries_are_evicted():
+    cache = MetricsCache(ttl=60, max_entries=3)
+    for key in ("a", "b", "c"):
+        cache.get(key, lambda: key)
+    cache.get("a", lambda: "unused")
+    cache.get("d", lambda: "d")
+    calls = []
+    assert cache.get("b", lambda: calls.append(1) or "b again") == "b again"
+    assert calls == [1]
+    assert cache.get("a", lambda: "unused") == "a"
+    stats = cache.stats()
+    assert stats["entries"] == 3 and stats["evictions_lru"] == 2
+
+
+def test_size_bound_evicts_oldest_entries():
+    cache = MetricsCache(ttl=60, max_entries=100, max_bytes=2500)
+    for key in ("a", "b", "c"):
+        cache.get(key, lambda: "x" * 1000)
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["approx_bytes"] <= 2500
+
+
+def test_entries_past_max_stale_are_recomputed():
+    cache = MetricsCache(ttl=0.01, max_stale=0.05)
+    cache.get("k", lambda: "old")
+    time.sleep(0.1)
+    # Too old to serve stale: the caller waits for a fresh value
+    assert cache.get("k", lambda: "new") == "new"
+    assert cache.stats()["evictions_expired"] == 1
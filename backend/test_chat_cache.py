@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the chatbot response cache: what counts as the same
+conversation, opt-in similarity matching and expiry.
+"""
+
+import time
+from services.chat_cache import ChatResponseCache
+
+
+def ask(*turns: str) -> list:
+    roles = ["user", "assistant"]
+    return [{"role": roles[i % 2], "content": text} for i, text in enumerate(turns)]
+
+
+def test_whole_normalized_conversation_is_the_key():
+    cache = ChatResponseCache(ttl=60, max_entries=10)
+    cache.put(ask("How do I transfer my warranty?"), "Use the transfer button.")
+    assert cache.get(ask("how do I transfer my  warranty")) == "Use the transfer button."
+    # Fuzzy matching is off by default, so a negation is a different question
+    assert cache.get(ask("Can't I transfer my warranty?")) is None
+
+    cache.put(ask("Hi", "Hello!", "What does it cost?"), "Gas only.")
+    assert cache.get(ask("Hi", "Hello!", "what does it cost")) == "Gas only."
+    # The same follow-up in another conversation is not a repeat
+    assert cache.get(ask("Tell me about repairs", "Sure.", "What does it cost?")) is None
+    # Only conversations that end with a user turn are cached
+    assert cache.make_key(ask("Hi", "Hello!")) is None
+
+
+def test_similar_questions_hit_when_enabled_and_entries_expire():
+    cache = ChatResponseCache(ttl=0.05, max_entries=10, similarity=0.6)
+    cache.put(ask("how do i transfer my warranty"), "Use the transfer button.")
+    assert cache.get(ask("how do i transfer my warranties")) == "Use the transfer button."
+    assert cache.get(ask("what is a repair log")) is None
+    time.sleep(0.1)
+    assert cache.get(ask("how do i transfer my warranty")) is None
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["similar_hits"]) == (0, 1)
+
+
+def test_least_recently_used_replies_are_evicted():
+    cache = ChatResponseCache(ttl=60, max_entries=2)
+    for question in ("one", "two", "three"):
+        cache.put(ask(question), question.upper())
+    assert cache.get(ask("one")) is None
+    assert cache.get(ask("three")) == "THREE"
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Unit tests for paginated event fetching: resuming from the saved cursors and
+retrying failed pages.
+"""
+
+from conftest import PagedChain, address, mint, repair
+from services.event_fetcher import EventFetcher
+
+
+class FlakyChain(PagedChain):
+    """Fails the first `failures` requests for one event type"""
+
+    def __init__(self, streams, kind: str, failures: int):
+        super().__init__(streams)
+        self.kind = kind
+        self.failures = failures
+
+    def query_events(self, query, cursor=None, limit=50, descending_order=False):
+        if query["MoveEventType"].endswith(self.kind) and self.failures:
+            self.failures -= 1
+            raise ConnectionError("node unavailable")
+        return super().query_events(query, cursor, limit, descending_order)
+
+
+def test_sync_pages_through_and_resumes_from_saved_cursors(store):
+    chain = PagedChain({"WarrantyMinted": [mint(n, address(1)) for n in range(7)]})
+    fetcher = EventFetcher(chain, page_size=3, backoff=0)
+    assert fetcher.sync(store) == {"mints": 7, "transfers": 0, "repairs": 0}
+    # Three mint pages plus one empty page per other type
+    assert chain.calls == 5
+
+    chain.streams["WarrantyMinted"].append(mint(7, address(1)))
+    chain.streams["RepairLogged"] = [repair(0), repair(7)]
+    chain.calls = 0
+    assert fetcher.sync(store) == {"mints": 1, "transfers": 0, "repairs": 2}
+    # Mints restart after m6 instead of from the beginning
+    assert chain.calls == 3
+    assert store.count() == 10
+
+
+def test_failed_pages_are_retried():
+    streams = {"RepairLogged": [repair(n) for n in range(4)]}
+    chain = FlakyChain(streams, "RepairLogged", failures=2)
+    fetcher = EventFetcher(chain, page_size=10, max_retries=3, backoff=0)
+    data, next_cursor, has_next_page = fetcher.fetch_page({"MoveEventType": "pkg::m::RepairLogged"}, None)
+    assert len(data) == 4 and next_cursor == {"txDigest": "r3", "eventSeq": "0"}
+    assert not has_next_page
+
+
+def test_exhausted_retries_skip_only_the_failing_type(store):
+    streams = {"WarrantyMinted": [mint(0, address(1))], "RepairLogged": [repair(0)]}
+    chain = FlakyChain(streams, "RepairLogged", failures=10)
+    fetcher = EventFetcher(chain, max_retries=2, backoff=0)
+    assert fetcher.sync(store) == {"mints": 1, "transfers": 0, "repairs": 0}
+    assert store.get_cursor("repairs") is None
+
+    # The next sync picks the failed type up from where it stopped
+    chain.failures = 0
+    assert fetcher.sync(store)["repairs"] == 1
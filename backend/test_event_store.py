@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the SQLite event index: page storage, per-type cursors and
+incremental reads.
+"""
+
+from conftest import address, mint, repair
+from services.event_store import EventStore, normalize_address
+
+
+def test_store_page_saves_cursor_and_ignores_duplicates(store):
+    page = [mint(n, address(1)) for n in range(3)]
+    assert store.get_cursor("mints") is None
+    assert store.store_page("mints", page, page[-1]["id"]) == 3
+    assert store.get_cursor("mints") == {"txDigest": "m2", "eventSeq": "0"}
+
+    # Re-delivered events are not stored twice
+    assert store.store_page("mints", page[1:] + [mint(3, address(1))]) == 1
+    assert store.count() == 4
+    assert store.count("mints") == 4
+    assert store.get_cursor("mints") == {"txDigest": "m3", "eventSeq": "0"}
+    assert store.get_cursor("repairs") is None
+
+
+def test_cursors_and_rows_survive_reopening(tmp_path):
+    path = str(tmp_path / "events.db")
+    store = EventStore(path)
+    store.store_page("mints", [mint(0, address(1))])
+    store.store_page("repairs", [repair(0)])
+    store.close()
+
+    reopened = EventStore(path)
+    assert reopened.get_cursor("repairs") == {"txDigest": "r0", "eventSeq": "0"}
+    rows = reopened.get_rows_since(0)
+    assert [(row[0], row[1]) for row in rows] == [(1, "mints"), (2, "repairs")]
+    assert [row[0] for row in reopened.get_rows_since(1)] == [2]
+    reopened.close()
+
+
+def test_addresses_are_stored_in_canonical_form(store):
+    event = mint(0, "0xAB")
+    event["parsedJson"]["owner"] = "0x" + "C" * 64
+    store.store_page("mints", [event])
+    _, _, _, sender, nft_id, owner, _ = store.get_rows_since(0)[0]
+    assert sender == normalize_address("0xab") == "0x" + "ab".zfill(64)
+    assert owner == "0x" + "c" * 64
+    assert nft_id == address(1000)
+    assert normalize_address("not an address") is None
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the NDJSON events export: cursor pagination, resuming after
+the last page and event type filters.
+"""
+
+import gzip
+import json
+import pytest
+import app as app_module
+from conftest import address, mint, repair
+from services.sustainability import SustainabilityService
+
+
+@pytest.fixture
+def client(ingestor, monkeypatch):
+    monkeypatch.setattr(app_module, "sustainability_service", SustainabilityService(ingestor=ingestor))
+    return app_module.app.test_client()
+
+
+def lines(response) -> list:
+    return [json.loads(line) for line in response.data.decode().splitlines()]
+
+
+def test_export_resumes_from_cursor(ingestor, client):
+    ingestor.store.store_page("mints", [mint(n, address(1)) for n in range(25)])
+
+    seen, cursor, links = [], 0, []
+    while True:
+        response = client.get("/api/sustainability/events", query_string={"cursor": cursor, "limit": 10})
+        assert response.status_code == 200
+        seen += [e["id"] for e in lines(response)]
+        cursor = int(response.headers["X-Next-Cursor"])
+        links.append("Link" in response.headers)
+        if not links[-1]:
+            break
+    assert seen == list(range(1, 26))
+    assert links == [True, True, False]
+    assert cursor == 25
+
+    # An empty page keeps the cursor, and new events are picked up from it
+    response = client.get("/api/sustainability/events", query_string={"cursor": cursor})
+    assert response.data == b"" and response.headers["X-Next-Cursor"] == "25"
+    ingestor.store.store_page("repairs", [repair(0), repair(1)])
+    response = client.get("/api/sustainability/events", query_string={"cursor": cursor})
+    assert [(e["id"], e["type"]) for e in lines(response)] == [(26, "RepairLogged"), (27, "RepairLogged")]
+    assert response.headers["X-Next-Cursor"] == "27"
+
+
+def test_type_filter_and_compression(ingestor, client):
+    ingestor.store.store_page("mints", [mint(n, address(1)) for n in range(3)])
+    ingestor.store.store_page("repairs", [repair(1)])
+
+    response = client.get("/api/sustainability/events", query_string={"type": "repairlogged"},
+                          headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    events = [json.loads(line) for line in gzip.decompress(response.data).decode().splitlines()]
+    assert [(e["id"], e["type"]) for e in events] == [(4, "RepairLogged")]
+
+    assert client.get("/api/sustainability/events", query_string={"type": "bogus"}).status_code == 400
+    assert client.get("/api/sustainability/events", query_string={"limit": 0}).status_code == 400
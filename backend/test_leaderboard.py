@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the seller leaderboard: competition ranking, incremental
+rescoring of touched sellers and calendar windows.
+"""
+
+import pytest
+from conftest import DAY_MS, NOW_MS, address, mint, repair
+from services.cache import MetricsCache
+from services.leaderboard import Leaderboard
+
+
+@pytest.fixture
+def board(ingestor):
+    return Leaderboard(ingestor, MetricsCache(ttl=60))
+
+
+def test_sellers_are_ranked_and_updated_incrementally(ingestor, board):
+    a, b, c = address(1), address(2), address(3)
+    ingestor.store.store_page("mints", [mint(n, seller) for n, seller in enumerate([a, a, b, b, c, c])])
+    ingestor.store.store_page("repairs", [repair(2), repair(3)])
+
+    top = board.top("ewaste")
+    # Ties share the rank of the first of them
+    assert [(e["rank"], e["seller"], e["score"]) for e in top["entries"]] == [(1, b, 36), (2, a, 20), (2, c, 20)]
+    assert board.top("warranties")["entries"][2]["rank"] == 1
+    assert board.rank(a, "ewaste")["rank"] == 2
+    assert board.rank(address(9), "ewaste") == {
+        "seller": address(9), "metric": "ewaste", "window": "all",
+        "rank": None, "score": 0, "sellers_ranked": 3
+    }
+
+    # New events move only the sellers they touch
+    ingestor.store.store_page("repairs", [repair(4), repair(5), repair(4, NOW_MS + 1)])
+    assert board.rank(c, "repairs") == {
+        "seller": c, "metric": "repairs", "window": "all", "rank": 1, "score": 3, "sellers_ranked": 2
+    }
+    assert board.rank(b, "repairs")["rank"] == 2
+    assert board.rank(a, "repairs")["rank"] is None
+    assert board.get_stats()["sellers_rescored"] == 4
+
+
+def test_windows_only_count_recent_events(ingestor, board):
+    old, recent = address(1), address(2)
+    ingestor.store.store_page("mints", [mint(n, old, NOW_MS - 60 * DAY_MS) for n in range(3)]
+                              + [mint(3, recent, NOW_MS)])
+    assert [e["seller"] for e in board.top("warranties")["entries"]] == [old, recent]
+    for window in ("month", "week"):
+        ranked = board.top("warranties", window)
+        assert [(e["seller"], e["score"]) for e in ranked["entries"]] == [(recent, 1)]
+        assert board.rank(old, "warranties", window)["rank"] is None
+
+
+def test_bulk_rescoring_sorts_every_seller(ingestor, board):
+    sellers = [address(10 + s) for s in range(100)]
+    ingestor.store.store_page("mints", [mint(n, sellers[n % 100]) for n in range(300)]
+                              + [mint(300 + s, sellers[s]) for s in range(0, 100, 3)])
+    top = board.top("warranties", limit=50)
+    assert top["sellers_ranked"] == 100
+    assert [e["score"] for e in top["entries"]] == [4] * 34 + [3] * 16
+    assert {e["rank"] for e in top["entries"]} == {1, 35}
+    assert [e["seller"] for e in top["entries"][:34]] == sorted(sellers[::3])
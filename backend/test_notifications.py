@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Unit tests for expiry notifications: which reminders are due, who receives
+them, deduplication across ticks and restarts, and retries.
+"""
+
+from typing import Dict, List
+import pytest
+from conftest import DAY_MS, NOW_MS, address, mint, transfer
+from services.notifications import FakeSender, NotificationSender, NotificationService
+from services.snapshot_store import FileSnapshotBackend
+
+
+class PickySender(NotificationSender):
+    """Rejects the listed NFTs, or raises while `down` is set"""
+
+    def __init__(self, rejected=(), down: bool = False):
+        self.rejected = set(rejected)
+        self.down = down
+        self.sent: List[Dict] = []
+
+    def send_batch(self, notifications: List[Dict]) -> List[bool]:
+        if self.down:
+            raise ConnectionError("FCM unavailable")
+        results = [n["nft_id"] not in self.rejected for n in notifications]
+        self.sent.extend(n for n, ok in zip(notifications, results) if ok)
+        return results
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return FileSnapshotBackend(str(tmp_path / "snapshots"))
+
+
+def notifier(ingestor, sender, backend) -> NotificationService:
+    service = NotificationService(ingestor, sender=sender, backend=backend)
+    service.rate = 0
+    return service
+
+
+def expiring_soon(ingestor):
+    """NFTs 0-2 expire in two days (NFT 1 was resold); NFT 3 in a year"""
+    ingestor.store.store_page("mints", [mint(n, address(1), expiry_ms=NOW_MS + 2 * DAY_MS) for n in range(3)]
+                              + [mint(3, address(1))])
+    ingestor.store.store_page("transfers", [transfer(1, address(77))])
+
+
+def test_due_reminders_go_to_current_owners_once(ingestor, backend):
+    expiring_soon(ingestor)
+    sender = FakeSender()
+    service = notifier(ingestor, sender, backend)
+    assert service.tick(NOW_MS) == 3
+    assert {n["nft_id"]: n["owner"] for n in sender.sent} == {
+        address(1000): address(2000), address(1001): address(77), address(1002): address(2002)
+    }
+    assert all(n["days_left"] == 2 for n in sender.sent)
+    assert service.tick(NOW_MS + 1) == 0
+    service.stop()
+
+    # A restarted notifier skips reminders recorded as sent
+    restarted = notifier(ingestor, FakeSender(), backend)
+    assert restarted.tick(NOW_MS + 2) == 0
+    assert restarted.stats["skipped"] == 3
+    restarted.stop()
+
+
+def test_rejected_reminders_are_retried(ingestor, backend):
+    expiring_soon(ingestor)
+    sender = PickySender(rejected={address(1001)})
+    service = notifier(ingestor, sender, backend)
+    assert service.tick(NOW_MS) == 2
+    assert service.stats["failed"] == 1
+    sender.rejected.clear()
+    # Nothing is resent before the retry delay
+    assert service.tick(NOW_MS + service.retry_ms - 1) == 0
+    assert service.tick(NOW_MS + service.retry_ms) == 1
+    assert sorted(n["nft_id"] for n in sender.sent) == [address(1000), address(1001), address(1002)]
+    service.stop()
+
+
+def test_failed_batches_are_retried(ingestor, backend):
+    expiring_soon(ingestor)
+    sender = PickySender(down=True)
+    service = notifier(ingestor, sender, backend)
+    assert service.tick(NOW_MS) == 0
+    assert service.stats["failed"] == 3
+    sender.down = False
+    assert service.tick(NOW_MS + service.retry_ms) == 3
+    assert service.stats["sent"] == 3
+    service.stop()
+
+
+def test_only_the_lock_holder_sends(ingestor, backend):
+    expiring_soon(ingestor)
+    leader = notifier(ingestor, FakeSender(), backend)
+    follower = notifier(ingestor, FakeSender(), backend)
+    assert leader.tick(NOW_MS) == 3
+    assert follower.tick(NOW_MS) == 0
+    assert follower.stats["ticks"] == 0
+    leader.stop()
+    follower.stop()
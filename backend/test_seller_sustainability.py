@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Unit tests for seller sustainability: achievements dated by the event that
+crossed each threshold, re-evaluation as new events are ingested, and the
+batch metrics endpoint.
+"""
+
+from datetime import datetime
+import pytest
+import app as app_module
+from config import Config
+from conftest import DAY_MS, NOW_MS, address, mint, repair
+from services.cache import MetricsCache
+from services.seller_sustainability import AchievementEngine, SellerSustainabilityService
+
+
+def mint_days(n: int) -> int:
+    return NOW_MS - (30 - n) * DAY_MS
+
+
+def repair_days(n: int) -> int:
+    return NOW_MS - (10 - n) * DAY_MS
+
+
+def by_name(achievements: list) -> dict:
+    return {a["name"]: a for a in achievements}
+
+
+def test_achievements_are_dated_by_the_crossing_event(ingestor):
+    seller = address(1)
+    ingestor.store.store_page("mints", [mint(n, seller, mint_days(n)) for n in range(10)])
+    ingestor.store.store_page("repairs", [repair(n, repair_days(n)) for n in range(6)])
+    engine = AchievementEngine(ingestor)
+
+    earned = by_name(engine.get(seller))
+    assert earned["First Warranty Issued"]["earned_at"] == mint_days(0)
+    assert earned["Warranty Pioneer"]["earned_at"] == mint_days(9)
+    # The fifth repair, not the sixth or the latest event
+    assert earned["Repair Specialist"]["earned_at"] == repair_days(4)
+    assert earned["Repair Specialist"]["impact"] == "Provided 6 repair services"
+    # 10 kg per warranty reaches 100 kg with the tenth mint
+    assert earned["E-waste Warrior"]["earned_at"] == mint_days(9)
+    # 60% repairs per warranty is below the champion rate
+    assert not earned["Sustainability Champion"]["earned"]
+
+    unknown = engine.get(address(9))
+    assert len(unknown) == len(earned)
+    assert not any(a["earned"] or a["earned_at"] for a in unknown)
+
+
+def test_new_events_re_evaluate_only_touched_sellers(ingestor):
+    a, b = address(1), address(2)
+    ingestor.store.store_page("mints", [mint(n, a, mint_days(n)) for n in range(5)]
+                              + [mint(5, b, mint_days(5))])
+    engine = AchievementEngine(ingestor)
+    assert not by_name(engine.get(a))["Sustainability Champion"]["earned"]
+    assert engine.get_stats()["sellers_evaluated"] == 2
+
+    # Four repairs on five warranties is an 80% repair rate
+    ingestor.store.store_page("repairs", [repair(n, repair_days(n)) for n in range(4)])
+    champion = by_name(engine.get(a))["Sustainability Champion"]
+    # The rate first reached 80% on the day of the fourth repair
+    assert champion["earned"]
+    assert champion["date"] == datetime.fromtimestamp(repair_days(3) / 1000).strftime("%Y-%m-%d")
+    engine.get(b)
+    stats = engine.get_stats()
+    assert (stats["passes"], stats["sellers_evaluated"], stats["sellers"]) == (2, 3, 2)
+
+
+@pytest.fixture
+def client(ingestor, monkeypatch):
+    service = SellerSustainabilityService(ingestor, cache=MetricsCache(ttl=60))
+    monkeypatch.setattr(app_module, "seller_sustainability_service", service)
+    return app_module.app.test_client()
+
+
+def test_batch_endpoint_returns_each_seller_once(ingestor, client):
+    a, b = address(1), address(2)
+    ingestor.store.store_page("mints", [mint(n, a) for n in range(3)] + [mint(3, b)])
+    ingestor.store.store_page("repairs", [repair(0)])
+
+    response = client.post("/api/seller/sustainability/batch",
+                           json={"addresses": [a, "0x2", a.upper().replace("0X", "0x"), "nope", address(9)]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert sorted(body["results"]) == [a, b, address(9)]
+    assert body["count"] == 3 and body["invalid"] == ["nope"]
+    assert (body["results"][a]["warranties_issued"], body["results"][a]["repair_services_provided"]) == (3, 1)
+    assert body["results"][b]["warranties_issued"] == 1
+    assert body["results"][address(9)]["warranties_issued"] == 0
+    # Batch results match the single-seller endpoint
+    single = client.get(f"/api/seller/sustainability/{a}").get_json()
+    assert {k: v for k, v in single.items() if k != "last_updated"} == \
+        {k: v for k, v in body["results"][a].items() if k != "last_updated"}
+
+
+@pytest.mark.parametrize("body", [["0x1"], {"addresses": "0x1"}, {"addresses": []}, {},
+                                  {"addresses": ["0x1"] * (Config.SELLER_BATCH_MAX + 1)}])
+def test_batch_endpoint_rejects_malformed_bodies(client, body):
+    assert client.post("/api/seller/sustainability/batch", json=body).status_code == 400
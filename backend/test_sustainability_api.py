@@ -134,16 +134,52 @@ def test_seller_trends():
         logger.error(f"❌ Seller trends error: {str(e)}")
         return False
 
+def test_seller_sustainability_batch():
+    """Test the batch seller sustainability metrics endpoint"""
+    try:
+        sellers = ["0x9876543210987654321098765432109876543210", "0x1234567890123456789012345678901234567890"]
+        response = requests.post(f"{BASE_URL}/api/seller/sustainability/batch", json={"addresses": sellers + sellers[:1]})
+        if response.status_code == 200:
+            data = response.json()
+            logger.info("✅ Seller sustainability batch endpoint working")
+            logger.info(f"   Sellers returned: {data.get('count', 0)}")
+            return True
+        else:
+            logger.error(f"❌ Seller sustainability batch failed: {response.status_code}")
+            return False
+    except Exception as e:
+        logger.error(f"❌ Seller sustainability batch error: {str(e)}")
+        return False
+
+def test_seller_leaderboard():
+    """Test the seller leaderboard endpoint"""
+    try:
+        response = requests.get(f"{BASE_URL}/api/seller/leaderboard", params={"metric": "ewaste", "window": "month"})
+        if response.status_code == 200:
+            data = response.json()
+            logger.info("✅ Seller leaderboard endpoint working")
+            logger.info(f"   Sellers ranked: {data.get('sellers_ranked', 0)}")
+            logger.info(f"   Top seller: {data['entries'][0]['seller'] if data.get('entries') else None}")
+            return True
+        else:
+            logger.error(f"❌ Seller leaderboard failed: {response.status_code}")
+            return False
+    except Exception as e:
+        logger.error(f"❌ Seller leaderboard error: {str(e)}")
+        return False
+
 def test_sustainability_events():
     """Test the sustainability events endpoint"""
     try:
-        response = requests.get(f"{BASE_URL}/api/sustainability/events")
+        response = requests.get(f"{BASE_URL}/api/sustainability/events", params={"limit": 100}, stream=True)
         if response.status_code == 200:
-            data = response.json()
+            events = [json.loads(line) for line in response.iter_lines() if line]
+            kinds = [event.get('kind') for event in events]
             logger.info("✅ Sustainability events endpoint working")
-            logger.info(f"   Transfer events: {len(data.get('transfers', []))}")
-            logger.info(f"   Repair events: {len(data.get('repairs', []))}")
-            logger.info(f"   Mint events: {len(data.get('mints', []))}")
+            logger.info(f"   Transfer events: {kinds.count('transfers')}")
+            logger.info(f"   Repair events: {kinds.count('repairs')}")
+            logger.info(f"   Mint events: {kinds.count('mints')}")
+            logger.info(f"   Next cursor: {response.headers.get('X-Next-Cursor')}")
             return True
         else:
             logger.error(f"❌ Sustainability events failed: {response.status_code}")
@@ -152,6 +188,23 @@ def test_sustainability_events():
         logger.error(f"❌ Sustainability events error: {str(e)}")
         return False
 
+def test_cache_stats():
+    """Test the metrics cache stats endpoint"""
+    try:
+        response = requests.get(f"{BASE_URL}/api/sustainability/cache-stats")
+        if response.status_code == 200:
+            data = response.json()
+            logger.info("✅ Cache stats endpoint working")
+            logger.info(f"   Metrics cache hit rate: {data.get('hit_rate', 0)}")
+            logger.info(f"   Cached entries: {data.get('entries', 0)}")
+            return True
+        else:
+            logger.error(f"❌ Cache stats failed: {response.status_code}")
+            return False
+    except Exception as e:
+        logger.error(f"❌ Cache stats error: {str(e)}")
+        return False
+
 def run_all_tests():
     """Run all API tests"""
     logger.info("🚀 Starting WarranChain Sustainability Dashboard API Tests...")
@@ -162,9 +215,12 @@ def run_all_tests():
         ("User Sustainability Metrics", test_user_sustainability_metrics),
         ("Sustainability Trends", test_sustainability_trends),
         ("Seller Sustainability Metrics", test_seller_sustainability_metrics),
+        ("Seller Sustainability Batch", test_seller_sustainability_batch),
         ("Seller Achievements", test_seller_achievements),
         ("Seller Trends", test_seller_trends),
+        ("Seller Leaderboard", test_seller_leaderboard),
         ("Sustainability Events", test_sustainability_events),
+        ("Cache Stats", test_cache_stats),
     ]
     
     passed = 0
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Unit tests for warranty verification: batch lookups by NFT id and serial
+number, and invalidation of cached results when new events are ingested.
+"""
+
+from conftest import DAY_MS, NOW_MS, address, mint, repair, transfer
+from services.verification import VerificationService
+
+
+def test_verify_many_reports_status_in_request_order(ingestor):
+    ingestor.store.store_page("mints", [mint(0, address(1)), mint(1, address(1), expiry_ms=NOW_MS - DAY_MS)])
+    ingestor.store.store_page("transfers", [transfer(0, address(77))])
+    ingestor.store.store_page("repairs", [repair(0), repair(0, NOW_MS + 1)])
+    service = VerificationService(ingestor)
+
+    unknown = address(999)
+    # Short and mixed-case ids resolve to the indexed address
+    results = service.verify_many([address(1001), unknown, hex(1000).upper().replace("0X", "0x")])
+    assert [r["found"] for r in results] == [True, False, True]
+    expired, missing, valid = results
+    assert (valid["owner"], valid["seller"], valid["serial_number"]) == (address(77), address(1), "SN0")
+    assert valid["repair_count"] == 2 and valid["valid"] and valid["days_left"] == 365
+    assert expired["is_expired"] and not expired["valid"] and expired["days_left"] == 0
+    assert missing == {"nft_id": unknown, "found": False, "valid": False}
+
+    # Repeated lookups are served from the cache
+    service.verify_many([address(1000), address(1000)])
+    stats = service.get_stats()
+    assert (stats["misses"], stats["hits"], stats["entries"]) == (3, 1, 3)
+
+
+def test_verify_serials_marks_unknown_serials(ingestor):
+    ingestor.store.store_page("mints", [mint(n, address(1)) for n in range(2)])
+    service = VerificationService(ingestor)
+    results = service.verify_serials(["SN1", "NOPE", "SN0"])
+    assert [r["nft_id"] for r in results] == [address(1001), None, address(1000)]
+    assert results[1] == {"nft_id": None, "found": False, "valid": False, "serial_number": "NOPE"}
+
+
+def test_new_events_invalidate_cached_results(ingestor):
+    ingestor.store.store_page("mints", [mint(n, address(1)) for n in range(3)])
+    service = VerificationService(ingestor)
+    assert [r["repair_count"] for r in service.verify_many([address(1000 + n) for n in range(3)])] == [0, 0, 0]
+
+    ingestor.store.store_page("repairs", [repair(0)])
+    ingestor.store.store_page("transfers", [transfer(1, address(77))])
+    results = service.verify_many([address(1000 + n) for n in range(3)])
+    assert results[0]["repair_count"] == 1
+    assert results[1]["owner"] == address(77)
+    # Only the two NFTs with new events were dropped from the cache
+    stats = service.get_stats()
+    assert stats["invalidations"] == 2 and stats["hits"] == 1
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Unit tests for WebSocket subscriptions: filter validation and routing of
+blockchain events to the clients that subscribed to them.
+"""
+
+import asyncio
+import json
+from conftest import address
+from services.websocket_service import WebSocketService
+
+
+class FakeSocket:
+    async def send(self, message: str):
+        pass
+
+
+def drain(service: WebSocketService, socket: FakeSocket) -> list:
+    queue = service.clients[socket].queue
+    messages = []
+    while not queue.empty():
+        messages.append(json.loads(queue.get_nowait()))
+    return messages
+
+
+def run_clients(subscriptions: list, events: list) -> list:
+    """Messages each client received after subscribing and one broadcast per event"""
+    service = WebSocketService(backend=None)
+
+    async def scenario():
+        sockets = [FakeSocket() for _ in subscriptions]
+        for socket, subscription in zip(sockets, subscriptions):
+            await service.register(socket)
+            await service.handle_client_message(socket, json.dumps({"type": "subscribe_events", **subscription}))
+        for event_type, event in events:
+            await service.broadcast_event(event_type, event)
+        received = [drain(service, socket) for socket in sockets]
+        for socket in sockets:
+            await service.unregister(socket)
+        return received
+
+    try:
+        return asyncio.run(scenario())
+    finally:
+        service.stop()
+
+
+def test_events_reach_only_matching_subscribers():
+    seller, owner, nft = address(1), address(2), address(3)
+    mint = {"seller": seller, "owner": owner, "nft_id": nft}
+    sold_on = {"seller": address(9), "owner": address(8), "from_address": owner, "nft_id": address(7)}
+    received = run_clients(
+        [{}, {"sellers": ["0x1"]}, {"owners": [owner.upper().replace("0X", "0x")]},
+         {"events": ["RepairLogged"]}, {"nft_ids": [nft], "events": ["WarrantyMinted"]}],
+        [("WarrantyMinted", mint), ("WarrantyTransferred", sold_on)]
+    )
+    routed = [[m["data"]["nft_id"] for m in messages if m["type"] == "blockchain_event"] for messages in received]
+    # Owner filters match both sides of a transfer
+    assert routed == [[nft, address(7)], [nft], [nft, address(7)], [], [nft]]
+    confirmed = received[1][1]
+    assert confirmed["type"] == "subscription_confirmed"
+    assert confirmed["sellers"] == [seller]
+
+
+def test_invalid_filters_are_rejected_without_changing_the_subscription():
+    received = run_clients(
+        [{"sellers": address(1)}, {"owners": [address(2), "not-an-address"]}, {"events": ["Bogus"]}],
+        [("WarrantyMinted", {"seller": address(5), "owner": address(6), "nft_id": address(7)})]
+    )
+    for messages, problem in zip(received, ["sellers must be a list", "Invalid owners", "Unknown events"]):
+        error = messages[1]
+        assert error["type"] == "subscription_error"
+        assert any(problem in e for e in error["errors"])
+        # The client keeps its previous (empty) subscription and still gets every event
+        assert messages[-1]["type"] == "blockchain_event"